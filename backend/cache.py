@@ -0,0 +1,53 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """Tiny TTL cache for rendered list responses.
+
+    The UI polls the list endpoints in parallel every few seconds; each
+    poll re-ran the same SQLite read and serialization. Entries hold the
+    final orjson bytes, so a hit costs a dict lookup and no Python
+    object construction at all. Write endpoints call invalidate(), and
+    the short TTL bounds staleness for writes that happen elsewhere
+    (e.g. the background poll loop).
+    """
+
+    def __init__(self, ttl: float = 2.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0
+        # key -> (expires_at, version_at_store, payload)
+        self._entries: Dict[tuple, Tuple[float, int, bytes]] = {}
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        """Return the cached payload for key, or None if missing/stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, version, payload = entry
+            if version != self._version or time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return payload
+
+    def put(self, key: tuple, payload: bytes):
+        """Store a rendered payload under key."""
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + self.ttl,
+                self._version,
+                payload
+            )
+
+    def invalidate(self):
+        """Drop everything; called after any write that changes a list."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+# Shared cache for the polled list endpoints
+list_cache = ResponseCache(ttl=2.0)
@@ -2,8 +2,12 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Load environment variables. The sentinel skips the .env filesystem walk
+# and re-parse when config is imported again in a child process that
+# inherited the environment (the values are already in os.environ).
+if not os.getenv("MAIL_MARKETING_ENV_LOADED"):
+    load_dotenv()
+    os.environ["MAIL_MARKETING_ENV_LOADED"] = "1"
 
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -19,18 +23,33 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
 # ChromaDB configuration
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", str(BACKEND_DIR / "chroma_db"))
-Path(CHROMA_PERSIST_DIR).mkdir(parents=True, exist_ok=True)
 
 # Knowledge base path
 KNOWLEDGE_BASE_DIR = BACKEND_DIR / "knowledge_base"
-KNOWLEDGE_BASE_DIR.mkdir(exist_ok=True)
+
+# Keep uploaded originals on disk after ingestion. The text lives in
+# ChromaDB either way; set KEEP_ORIGINALS=false to drop the copy and
+# halve per-document storage.
+KEEP_ORIGINALS = os.getenv("KEEP_ORIGINALS", "true").lower() != "false"
 
 # Email polling configuration
 POLLING_INTERVAL_MINUTES = int(os.getenv("POLLING_INTERVAL_MINUTES", "3"))
 
 # Database path
 DATABASE_PATH = BACKEND_DIR / "data" / "email_data.db"
-DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+
+def ensure_dirs():
+    """Create the data directories if missing.
+
+    Called explicitly at startup (and from Database.__init__) instead of
+    as an import side effect, so importing config just to read a constant
+    costs no disk I/O. The isdir check keeps the common already-exists
+    case to a single stat.
+    """
+    for path in (CHROMA_PERSIST_DIR, KNOWLEDGE_BASE_DIR, DATABASE_PATH.parent):
+        if not os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
 
 # Classification labels
 class EmailCategory:
@@ -1,155 +1,445 @@
-import sqlite3
+import atexit
+import functools
 import json
+import sqlite3
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 from contextlib import contextmanager
 
-from config import DATABASE_PATH
+from config import DATABASE_PATH, ensure_dirs
 from models.schemas import Email, EmailCategory, EmailStatus
 
+# Plain dict lookups are several times faster than Enum.__call__, which
+# matters in the per-row conversion loop
+_CATEGORY_MAP = EmailCategory._value2member_map_
+_STATUS_MAP = EmailStatus._value2member_map_
+
+
+# Bump whenever _SCHEMA_SQL changes; _init_db skips the DDL entirely when
+# the database file is already at this version
+_SCHEMA_VERSION = 3
+
+_SCHEMA_SQL = f"""
+    CREATE TABLE IF NOT EXISTS emails (
+        id TEXT PRIMARY KEY,
+        thread_id TEXT,
+        sender TEXT,
+        sender_name TEXT,
+        recipient TEXT,
+        subject TEXT,
+        body TEXT,
+        received_at INTEGER,
+        category TEXT,
+        status TEXT,
+        ai_response TEXT,
+        processed_at INTEGER,
+        draft_id TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS attachments (
+        email_id TEXT,
+        idx INTEGER,
+        filename TEXT,
+        mime_type TEXT,
+        size INTEGER,
+        PRIMARY KEY (email_id, idx),
+        FOREIGN KEY (email_id) REFERENCES emails(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS drafts (
+        id TEXT PRIMARY KEY,
+        email_id TEXT,
+        gmail_draft_id TEXT,
+        ai_response TEXT,
+        created_at INTEGER,
+        status TEXT DEFAULT 'pending',
+        FOREIGN KEY (email_id) REFERENCES emails(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_emails_status_received
+        ON emails(status, received_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_emails_status_processed
+        ON emails(status, processed_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_emails_category
+        ON emails(category);
+    CREATE INDEX IF NOT EXISTS idx_emails_received
+        ON emails(received_at);
+    CREATE INDEX IF NOT EXISTS idx_drafts_status_created
+        ON drafts(status, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_drafts_email_id
+        ON drafts(email_id);
+
+    INSERT OR IGNORE INTO settings (key, value)
+    VALUES ('polling_interval', '3'),
+           ('auto_reply_enabled', 'true');
+
+    PRAGMA user_version = {_SCHEMA_VERSION};
+"""
+
+# Hot-path SQL hoisted to module level so the identical string hits
+# SQLite's statement cache on every call
+_INSERT_EMAIL_SQL = """
+    INSERT INTO emails
+    (id, thread_id, sender, sender_name, recipient, subject, body,
+     received_at, category, status, ai_response, processed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        category = excluded.category,
+        status = excluded.status,
+        ai_response = excluded.ai_response,
+        processed_at = excluded.processed_at
+"""
+
+_INSERT_ATTACHMENT_SQL = """
+    INSERT OR REPLACE INTO attachments (email_id, idx, filename, mime_type, size)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _legacy_ts_to_epoch(value) -> Optional[int]:
+    """Convert a legacy TEXT timestamp to epoch seconds (migration only).
+
+    Pre-versioning databases stored ISO strings; databases upgraded
+    before the rebuild existed may also hold stringified epoch ints
+    coerced into the TEXT columns.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        return None
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    """Convert a stored timestamp to datetime.
+
+    Timestamps are stored as epoch seconds (INTEGER); rows written by
+    older versions may still hold ISO strings.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    return datetime.fromisoformat(value)
+
 
 class Database:
     """SQLite database for storing email metadata and processing history."""
 
     def __init__(self):
+        ensure_dirs()
         self.db_path = DATABASE_PATH
+        self._tls = threading.local()
+        self._known_ids: Optional[set] = None
+        self._settings: Optional[Dict[str, str]] = None
         self._init_db()
+        atexit.register(self.close)
 
     def _init_db(self):
-        """Initialize database tables."""
+        """Initialize database tables (no-op when already at the current
+        schema version)."""
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-
-            # Processed emails table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS emails (
-                    id TEXT PRIMARY KEY,
-                    thread_id TEXT,
-                    sender TEXT,
-                    sender_name TEXT,
-                    recipient TEXT,
-                    subject TEXT,
-                    body TEXT,
-                    attachments TEXT,
-                    received_at TEXT,
-                    category TEXT,
-                    status TEXT,
-                    ai_response TEXT,
-                    processed_at TEXT,
-                    draft_id TEXT
-                )
-            """)
-
-            # Drafts table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS drafts (
-                    id TEXT PRIMARY KEY,
-                    email_id TEXT,
-                    gmail_draft_id TEXT,
-                    ai_response TEXT,
-                    created_at TEXT,
-                    status TEXT DEFAULT 'pending',
-                    FOREIGN KEY (email_id) REFERENCES emails(id)
-                )
+            # Journal mode is persistent, so setting it once here is enough.
+            # WAL is meaningless for in-memory databases (as used by tests).
+            if str(self.db_path) != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= _SCHEMA_VERSION:
+                return
+
+            if version == 0 and conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emails'"
+            ).fetchone():
+                # Pre-versioning database: its timestamp columns have TEXT
+                # affinity and attachments live in a JSON column, which
+                # CREATE TABLE IF NOT EXISTS cannot fix — rebuild instead
+                self._migrate_legacy_schema(conn)
+                return
+
+            # One batch for all DDL + default settings instead of a
+            # statement per table/index
+            conn.executescript(_SCHEMA_SQL)
+
+    @staticmethod
+    def _migrate_legacy_schema(conn: sqlite3.Connection):
+        """Rebuild a pre-versioning database in place.
+
+        Old databases stored received_at/processed_at/created_at as ISO
+        TEXT; the columns keep TEXT affinity, so epoch ints written by
+        the current code would be coerced to digit strings, breaking both
+        _parse_ts and ORDER BY. The tables are recreated with INTEGER
+        timestamp columns, values are backfilled as epoch seconds, and
+        the legacy emails.attachments JSON column is exploded into the
+        attachments table. All inside one transaction, so a crash leaves
+        the old database untouched.
+        """
+        conn.create_function(
+            "legacy_epoch", 1, _legacy_ts_to_epoch, deterministic=True
+        )
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("ALTER TABLE emails RENAME TO emails_legacy")
+            conn.execute("ALTER TABLE drafts RENAME TO drafts_legacy")
+            # Indexes follow renamed tables but keep their names; drop any
+            # so the schema script can recreate them on the new tables
+            for name in ("idx_emails_status_received", "idx_emails_status_processed",
+                         "idx_emails_category", "idx_emails_received",
+                         "idx_drafts_status_created", "idx_drafts_email_id"):
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+            # executescript would commit the open transaction, so run the
+            # schema statements individually
+            for statement in _SCHEMA_SQL.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+
+            conn.execute("""
+                INSERT INTO emails
+                (id, thread_id, sender, sender_name, recipient, subject, body,
+                 received_at, category, status, ai_response, processed_at, draft_id)
+                SELECT id, thread_id, sender, sender_name, recipient, subject, body,
+                       legacy_epoch(received_at), category, status, ai_response,
+                       legacy_epoch(processed_at), draft_id
+                FROM emails_legacy
             """)
-
-            # Settings table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
+            conn.execute("""
+                INSERT INTO drafts
+                (id, email_id, gmail_draft_id, ai_response, created_at, status)
+                SELECT id, email_id, gmail_draft_id, ai_response,
+                       legacy_epoch(created_at), status
+                FROM drafts_legacy
             """)
 
-            # Initialize default settings
-            cursor.execute("""
-                INSERT OR IGNORE INTO settings (key, value)
-                VALUES ('polling_interval', '3'),
-                       ('auto_reply_enabled', 'true')
+            cursor = conn.execute("""
+                SELECT id, attachments FROM emails_legacy
+                WHERE attachments IS NOT NULL AND attachments != ''
             """)
-
-            conn.commit()
+            for email_id, raw in cursor.fetchall():
+                try:
+                    attachments = json.loads(raw)
+                except ValueError:
+                    continue
+                conn.executemany(_INSERT_ATTACHMENT_SQL, (
+                    (email_id, i, a.get("filename"), a.get("mime_type"), a.get("size"))
+                    for i, a in enumerate(attachments) if isinstance(a, dict)
+                ))
+
+            conn.execute("DROP TABLE emails_legacy")
+            conn.execute("DROP TABLE drafts_legacy")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _configure_connection(conn: sqlite3.Connection):
+        """Apply per-connection performance PRAGMAs.
+
+        journal_mode=WAL is sticky on the database file, but these settings
+        only live as long as the connection, so they must be re-applied on
+        every new connection.
+        """
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Checkpoint less often than the 1000-page default so bursty poll
+        # writes aren't stalled by mid-burst WAL checkpoints
+        conn.execute("PRAGMA wal_autocheckpoint=2000")
 
     @contextmanager
     def _get_connection(self):
-        """Get database connection with context manager."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
+        """Yield this thread's long-lived connection, opening it on first use.
+
+        Opening/closing a connection per call dominates the cost of small
+        queries, so each thread keeps one connection for the process
+        lifetime (the background scheduler runs in its own threads).
+        """
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            # isolation_level=None puts the connection in autocommit mode:
+            # single statements commit themselves and batch writes manage
+            # their own BEGIN IMMEDIATE ... COMMIT, instead of the legacy
+            # implicit-BEGIN behaviour
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=256
+            )
+            conn.row_factory = sqlite3.Row
+            self._configure_connection(conn)
+            self._tls.conn = conn
+        yield conn
+
+    def close(self):
+        """Close this thread's cached connection (for shutdown)."""
+        conn = getattr(self._tls, "conn", None)
+        if conn is not None:
+            # Nearly free, and keeps planner statistics fresh for the
+            # indexes so they keep getting picked
+            conn.execute("PRAGMA optimize")
             conn.close()
+            self._tls.conn = None
+
+    def _email_row(self, email: Email) -> tuple:
+        """Build the INSERT parameter tuple for an email."""
+        return (
+            email.id,
+            email.thread_id,
+            email.sender,
+            email.sender_name,
+            email.recipient,
+            email.subject,
+            email.body,
+            int(email.received_at.timestamp()),
+            email.category.value if email.category else None,
+            email.status.value,
+            email.ai_response,
+            int(email.processed_at.timestamp()) if email.processed_at else None
+        )
+
+    @staticmethod
+    def _attachment_rows(email: Email):
+        """Yield attachment INSERT parameter tuples for an email."""
+        for i, a in enumerate(email.attachments):
+            yield (email.id, i, a.filename, a.mime_type, a.size)
 
     def save_email(self, email: Email) -> bool:
         """Save processed email to database."""
         with self._get_connection() as conn:
             cursor = conn.cursor()
 
-            attachments_json = json.dumps([
-                {"filename": a.filename, "mime_type": a.mime_type, "size": a.size}
-                for a in email.attachments
-            ])
+            cursor.execute(_INSERT_EMAIL_SQL, self._email_row(email))
+            if email.attachments:
+                cursor.executemany(_INSERT_ATTACHMENT_SQL, self._attachment_rows(email))
 
-            cursor.execute("""
-                INSERT OR REPLACE INTO emails
-                (id, thread_id, sender, sender_name, recipient, subject, body,
-                 attachments, received_at, category, status, ai_response, processed_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                email.id,
-                email.thread_id,
-                email.sender,
-                email.sender_name,
-                email.recipient,
-                email.subject,
-                email.body,
-                attachments_json,
-                email.received_at.isoformat(),
-                email.category.value if email.category else None,
-                email.status.value,
-                email.ai_response,
-                email.processed_at.isoformat() if email.processed_at else None
-            ))
+            if self._known_ids is not None:
+                self._known_ids.add(email.id)
+            return True
+
+    def save_emails(self, emails: List[Email]) -> bool:
+        """Save a batch of emails in a single transaction.
 
-            conn.commit()
+        Each save_email call pays one commit (and thus one fsync); for the
+        N emails a poll cycle returns, executemany inside one transaction
+        amortizes that down to a single commit.
+        """
+        if not emails:
+            return True
+
+        with self._get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    _INSERT_EMAIL_SQL,
+                    (self._email_row(email) for email in emails)
+                )
+                conn.executemany(_INSERT_ATTACHMENT_SQL, (
+                    row for email in emails for row in self._attachment_rows(email)
+                ))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            if self._known_ids is not None:
+                self._known_ids.update(email.id for email in emails)
             return True
 
     def get_email(self, email_id: str) -> Optional[Email]:
-        """Get email by ID."""
+        """Get email by ID, including its attachments."""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM emails WHERE id = ?", (email_id,))
             row = cursor.fetchone()
 
             if row:
-                return self._row_to_email(row)
+                email = self._row_to_email(row)
+                email.attachments = self.get_attachments(email_id)
+                return email
             return None
 
-    def get_pending_emails(self) -> List[Email]:
-        """Get emails that need manual reply."""
+    def get_attachments(self, email_id: str) -> List[Dict[str, Any]]:
+        """Get attachment metadata for an email."""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT * FROM emails
+                SELECT filename, mime_type, size FROM attachments
+                WHERE email_id = ?
+                ORDER BY idx
+            """, (email_id,))
+            return [dict(row) for row in cursor]
+
+    def get_pending_emails(self) -> Iterator[Dict[str, Any]]:
+        """Yield emails that need manual reply, newest first.
+
+        The pending view's detail pane renders attachment metadata
+        straight from this payload, so the (tiny) filename/mime_type/size
+        rows ride along — fetched with one IN query for the whole result
+        set rather than a query per email.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, thread_id, sender, sender_name, recipient, subject,
+                       body, received_at, category, status, ai_response, processed_at
+                FROM emails
                 WHERE status = 'manual_required'
                 ORDER BY received_at DESC
             """)
-            rows = cursor.fetchall()
-            return [self._row_to_email(row) for row in rows]
-
-    def get_email_history(self, limit: int = 50) -> List[Email]:
-        """Get recent email history."""
+            items = [self._row_to_summary(row) for row in cursor]
+
+            if items:
+                placeholders = ",".join("?" * len(items))
+                cursor.execute(f"""
+                    SELECT email_id, filename, mime_type, size FROM attachments
+                    WHERE email_id IN ({placeholders})
+                    ORDER BY email_id, idx
+                """, [item["id"] for item in items])
+                by_email: Dict[str, List[Dict[str, Any]]] = {}
+                for row in cursor:
+                    by_email.setdefault(row["email_id"], []).append({
+                        "filename": row["filename"],
+                        "mime_type": row["mime_type"],
+                        "size": row["size"]
+                    })
+                for item in items:
+                    item["attachments"] = by_email.get(item["id"], [])
+
+            yield from items
+
+    def get_email_history(self, limit: int = 50) -> Iterator[Dict[str, Any]]:
+        """Yield recent email history, most recently processed first."""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT * FROM emails
+                SELECT id, thread_id, sender, sender_name, recipient, subject,
+                       body, received_at, category, status, ai_response, processed_at
+                FROM emails
                 WHERE status = 'replied'
                 ORDER BY processed_at DESC
                 LIMIT ?
             """, (limit,))
-            rows = cursor.fetchall()
-            return [self._row_to_email(row) for row in rows]
+            for row in cursor:
+                yield self._row_to_summary(row)
 
     def update_email_status(
         self,
@@ -161,34 +451,41 @@ class Database:
         with self._get_connection() as conn:
             cursor = conn.cursor()
 
-            if ai_response:
-                cursor.execute("""
-                    UPDATE emails
-                    SET status = ?, ai_response = ?, processed_at = ?
-                    WHERE id = ?
-                """, (status.value, ai_response, datetime.now().isoformat(), email_id))
-            else:
-                cursor.execute("""
-                    UPDATE emails
-                    SET status = ?, processed_at = ?
-                    WHERE id = ?
-                """, (status.value, datetime.now().isoformat(), email_id))
-
-            conn.commit()
+            # COALESCE keeps the stored ai_response when None is passed,
+            # so both variants share one prepared statement
+            cursor.execute("""
+                UPDATE emails
+                SET status = ?,
+                    ai_response = COALESCE(?, ai_response),
+                    processed_at = ?
+                WHERE id = ?
+            """, (status.value, ai_response, int(time.time()), email_id))
+
             return cursor.rowcount > 0
 
     def is_email_processed(self, email_id: str) -> bool:
-        """Check if an email has already been processed."""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id FROM emails WHERE id = ?", (email_id,))
-            return cursor.fetchone() is not None
+        """Check if an email has already been processed.
+
+        Answered from an in-process set of known IDs (loaded lazily from
+        the emails table) so the per-message dedup check during polling
+        doesn't hit SQLite at all. save_email/save_emails keep the set in
+        sync after each successful write.
+        """
+        if self._known_ids is None:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id FROM emails")
+                self._known_ids = {row["id"] for row in cursor}
+        return email_id in self._known_ids
 
     def _row_to_email(self, row) -> Email:
-        """Convert database row to Email object."""
-        attachments = json.loads(row["attachments"] or "[]")
+        """Convert database row to Email object.
 
-        return Email(
+        model_construct skips validation: every value here was validated
+        on the way into the database, so re-running the validators per
+        read buys nothing.
+        """
+        return Email.model_construct(
             id=row["id"],
             thread_id=row["thread_id"],
             sender=row["sender"],
@@ -196,14 +493,27 @@ class Database:
             recipient=row["recipient"],
             subject=row["subject"],
             body=row["body"],
-            attachments=attachments,
-            received_at=datetime.fromisoformat(row["received_at"]),
-            category=EmailCategory(row["category"]) if row["category"] else None,
-            status=EmailStatus(row["status"]) if row["status"] else EmailStatus.PENDING,
+            received_at=_parse_ts(row["received_at"]),
+            category=_CATEGORY_MAP.get(row["category"]),
+            status=_STATUS_MAP.get(row["status"], EmailStatus.PENDING),
             ai_response=row["ai_response"],
-            processed_at=datetime.fromisoformat(row["processed_at"]) if row["processed_at"] else None
+            processed_at=_parse_ts(row["processed_at"])
         )
 
+    def _row_to_summary(self, row) -> Dict[str, Any]:
+        """Project a list-query row straight to the wire shape.
+
+        The stored category/status strings are exactly what the API
+        serializes the enums to, so the row passes through as a dict with
+        only the timestamps converted (to the ISO strings the frontend's
+        Date parsing expects) — no model construction per row.
+        """
+        item = dict(row)
+        item["received_at"] = _parse_ts(item["received_at"]).isoformat()
+        processed = _parse_ts(item["processed_at"])
+        item["processed_at"] = processed.isoformat() if processed else None
+        return item
+
     # Draft methods
     def save_draft(
         self,
@@ -218,12 +528,40 @@ class Database:
             cursor.execute("""
                 INSERT INTO drafts (id, email_id, gmail_draft_id, ai_response, created_at)
                 VALUES (?, ?, ?, ?, ?)
-            """, (draft_id, email_id, gmail_draft_id, ai_response, datetime.now().isoformat()))
-            conn.commit()
+            """, (draft_id, email_id, gmail_draft_id, ai_response, int(time.time())))
+            return True
+
+    def save_drafts(self, drafts: List[tuple]) -> bool:
+        """Save a batch of (draft_id, email_id, gmail_draft_id, ai_response)
+        rows in a single transaction."""
+        if not drafts:
+            return True
+
+        # One clock read shared by the whole batch
+        now = int(time.time())
+
+        with self._get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("""
+                    INSERT INTO drafts (id, email_id, gmail_draft_id, ai_response, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (
+                    (draft_id, email_id, gmail_draft_id, ai_response, now)
+                    for draft_id, email_id, gmail_draft_id, ai_response in drafts
+                ))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
             return True
 
     def get_pending_drafts(self) -> List[Dict[str, Any]]:
-        """Get drafts awaiting approval."""
+        """Get drafts awaiting approval as flat joined rows.
+
+        The API layer projects these into its response shape; this avoids
+        building a nested dict per row just for the route to reshape it.
+        """
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -233,23 +571,14 @@ class Database:
                 WHERE d.status = 'pending'
                 ORDER BY d.created_at DESC
             """)
-            rows = cursor.fetchall()
-
-            return [{
-                "id": row["id"],
-                "email_id": row["email_id"],
-                "gmail_draft_id": row["gmail_draft_id"],
-                "ai_response": row["ai_response"],
-                "created_at": row["created_at"],
-                "status": row["status"],
-                "original_email": {
-                    "sender": row["sender"],
-                    "sender_name": row["sender_name"],
-                    "subject": row["subject"],
-                    "body": row["body"],
-                    "received_at": row["received_at"]
-                }
-            } for row in rows]
+
+            rows = []
+            for row in cursor:
+                item = dict(row)
+                item["created_at"] = _parse_ts(item["created_at"]).isoformat()
+                item["received_at"] = _parse_ts(item["received_at"]).isoformat()
+                rows.append(item)
+            return rows
 
     def update_draft_status(self, draft_id: str, status: str) -> bool:
         """Update draft status."""
@@ -259,7 +588,6 @@ class Database:
                 "UPDATE drafts SET status = ? WHERE id = ?",
                 (status, draft_id)
             )
-            conn.commit()
             return cursor.rowcount > 0
 
     def get_draft(self, draft_id: str) -> Optional[Dict[str, Any]]:
@@ -277,17 +605,26 @@ class Database:
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM drafts WHERE id = ?", (draft_id,))
-            conn.commit()
             return cursor.rowcount > 0
 
     # Settings methods
+    def _load_settings(self) -> Dict[str, str]:
+        """Load the settings table into the in-process cache.
+
+        Settings are read on every poll cycle and every health check but
+        only change through set_setting, so one SELECT at first use (and
+        a dict update on each write) replaces a query per read.
+        """
+        if self._settings is None:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT key, value FROM settings")
+                self._settings = {row["key"]: row["value"] for row in cursor}
+        return self._settings
+
     def get_setting(self, key: str) -> Optional[str]:
         """Get a setting value."""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-            row = cursor.fetchone()
-            return row["value"] if row else None
+        return self._load_settings().get(key)
 
     def set_setting(self, key: str, value: str) -> bool:
         """Set a setting value."""
@@ -297,7 +634,7 @@ class Database:
                 "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
                 (key, value)
             )
-            conn.commit()
+            self._load_settings()[key] = value
             return True
 
     # Statistics
@@ -306,44 +643,40 @@ class Database:
         with self._get_connection() as conn:
             cursor = conn.cursor()
 
-            stats = {}
-
-            cursor.execute("SELECT COUNT(*) FROM emails")
-            stats["total_emails_processed"] = cursor.fetchone()[0]
-
-            cursor.execute(
-                "SELECT COUNT(*) FROM emails WHERE category = ?",
-                (EmailCategory.AUTO_REPLY.value,)
-            )
-            stats["auto_replied"] = cursor.fetchone()[0]
-
-            cursor.execute(
-                "SELECT COUNT(*) FROM emails WHERE category = ?",
-                (EmailCategory.RAG_REPLY.value,)
-            )
-            stats["rag_replied"] = cursor.fetchone()[0]
-
-            cursor.execute(
-                "SELECT COUNT(*) FROM emails WHERE status = ?",
-                (EmailStatus.MANUAL_REQUIRED.value,)
-            )
-            stats["pending_manual"] = cursor.fetchone()[0]
-
-            cursor.execute(
-                "SELECT COUNT(*) FROM drafts WHERE status = 'pending'"
-            )
-            stats["drafts_pending"] = cursor.fetchone()[0]
-
-            return stats
-
+            # Conditional aggregation: one pass over emails instead of four
+            # separate COUNT(*) scans. The drafts count rides along as a
+            # scalar subquery so the whole snapshot is one statement.
+            cursor.execute("""
+                SELECT
+                    COUNT(*) AS total,
+                    COALESCE(SUM(category = ?), 0) AS auto_replied,
+                    COALESCE(SUM(category = ?), 0) AS rag_replied,
+                    COALESCE(SUM(status = ?), 0) AS pending_manual,
+                    (SELECT COUNT(*) FROM drafts WHERE status = 'pending')
+                        AS drafts_pending
+                FROM emails
+            """, (
+                EmailCategory.AUTO_REPLY.value,
+                EmailCategory.RAG_REPLY.value,
+                EmailStatus.MANUAL_REQUIRED.value
+            ))
+            row = cursor.fetchone()
 
-# Singleton instance
-_database: Optional[Database] = None
+            return {
+                "total_emails_processed": row["total"],
+                "auto_replied": row["auto_replied"],
+                "rag_replied": row["rag_replied"],
+                "pending_manual": row["pending_manual"],
+                "drafts_pending": row["drafts_pending"]
+            }
 
 
+@functools.lru_cache(maxsize=1)
 def get_database() -> Database:
-    """Get or create database instance."""
-    global _database
-    if _database is None:
-        _database = Database()
-    return _database
+    """Get or create the database instance.
+
+    lru_cache's C-level lock makes this safe under concurrent startup,
+    unlike the check-then-set global it replaces, and the cached lookup
+    is cheaper on the per-request path.
+    """
+    return Database()
@@ -1,25 +1,30 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.background import BackgroundScheduler
+from fastapi.responses import ORJSONResponse
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from config import POLLING_INTERVAL_MINUTES
+from config import POLLING_INTERVAL_MINUTES, ensure_dirs
 from routes import emails, drafts, knowledge
 from services.email_processor import get_polling_service, process_new_emails, initialize_system
 from services.rag_service import get_rag_service
 from database import get_database
 
 
-# Background scheduler
-scheduler = BackgroundScheduler()
+# Background scheduler, driven by the app's event loop instead of a
+# dedicated scheduler thread
+scheduler = AsyncIOScheduler()
 
 
-def scheduled_email_check():
+async def scheduled_email_check():
     """Scheduled task to check for new emails."""
     service = get_polling_service()
     if service.is_running:
         try:
-            count = process_new_emails()
+            # The Gmail/AI calls are blocking, so run the poll in a worker
+            # thread and keep the event loop free to serve requests
+            count = await asyncio.to_thread(process_new_emails)
             if count > 0:
                 print(f"Processed {count} new emails")
         except Exception as e:
@@ -33,6 +38,7 @@ async def lifespan(app: FastAPI):
     print("Starting AI Email Auto-Reply System...")
 
     # Initialize services
+    ensure_dirs()
     get_database()
     get_rag_service()
 
@@ -64,6 +70,7 @@ async def lifespan(app: FastAPI):
     print("Shutting down...")
     polling_service.stop()
     scheduler.shutdown()
+    get_database().close()
 
 
 # Create FastAPI app
@@ -71,7 +78,8 @@ app = FastAPI(
     title="AI Email Auto-Reply System",
     description="Automated email response system using AI classification and RAG",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
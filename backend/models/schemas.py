@@ -22,7 +22,8 @@ class EmailAttachment(BaseModel):
     filename: str
     mime_type: str
     size: int
-    content: Optional[str] = None  # Base64 encoded for small files
+    attachment_id: Optional[str] = None  # Gmail id for on-demand download
+    content: Optional[str] = None  # Base64 encoded, only when fetched
 
 
 class Email(BaseModel):
@@ -1,19 +1,42 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Response
 import uuid
 
+import orjson
+
 from models.schemas import DraftEdit, EmailStatus
-from services.gmail_service import get_gmail_service
+from services.gmail_service import get_gmail_service, ensure_re_prefix
 from database import get_database
+from cache import list_cache
 
 router = APIRouter(prefix="/api/drafts", tags=["drafts"])
 
 
-@router.get("", response_model=List[Dict[str, Any]])
+@router.get("")
 async def get_pending_drafts():
     """Get drafts awaiting approval."""
     db = get_database()
-    return db.get_pending_drafts()
+    payload = list_cache.get(("drafts_pending",))
+    if payload is None:
+        payload = orjson.dumps([
+            {
+                "id": row["id"],
+                "email_id": row["email_id"],
+                "gmail_draft_id": row["gmail_draft_id"],
+                "ai_response": row["ai_response"],
+                "created_at": row["created_at"],
+                "status": row["status"],
+                "original_email": {
+                    "sender": row["sender"],
+                    "sender_name": row["sender_name"],
+                    "subject": row["subject"],
+                    "body": row["body"],
+                    "received_at": row["received_at"]
+                }
+            }
+            for row in db.get_pending_drafts()
+        ])
+        list_cache.put(("drafts_pending",), payload)
+    return Response(content=payload, media_type="application/json")
 
 
 @router.get("/{draft_id}")
@@ -52,6 +75,7 @@ async def approve_draft(draft_id: str):
 
     # Update original email status
     db.update_email_status(draft["email_id"], EmailStatus.REPLIED)
+    list_cache.invalidate()
 
     return {
         "success": True,
@@ -75,27 +99,20 @@ async def edit_draft(draft_id: str, edit: DraftEdit):
     if not original_email:
         raise HTTPException(status_code=404, detail="Original email not found")
 
-    # Delete old Gmail draft
-    gmail.delete_draft(draft["gmail_draft_id"])
-
-    # Create new draft with edited content
+    # Update the Gmail draft in place (one API call, id is preserved)
     from models.schemas import EmailReply
 
-    subject = original_email.subject
-    if not subject.lower().startswith("re:"):
-        subject = f"Re: {subject}"
-
     reply = EmailReply(
         to=original_email.sender,
-        subject=subject,
+        subject=ensure_re_prefix(original_email.subject),
         body=edit.content,
         thread_id=original_email.thread_id
     )
 
-    new_gmail_draft_id = gmail.create_draft(reply)
+    new_gmail_draft_id = gmail.update_draft(draft["gmail_draft_id"], reply)
 
     if not new_gmail_draft_id:
-        raise HTTPException(status_code=500, detail="Failed to create updated draft")
+        raise HTTPException(status_code=500, detail="Failed to update draft")
 
     # Update draft in database
     with db._get_connection() as conn:
@@ -105,7 +122,8 @@ async def edit_draft(draft_id: str, edit: DraftEdit):
             SET gmail_draft_id = ?, ai_response = ?
             WHERE id = ?
         """, (new_gmail_draft_id, edit.content, draft_id))
-        conn.commit()
+
+    list_cache.invalidate()
 
     return {
         "success": True,
@@ -132,5 +150,6 @@ async def discard_draft(draft_id: str):
 
     # Update email status to pending manual (so it shows up again)
     db.update_email_status(draft["email_id"], EmailStatus.MANUAL_REQUIRED)
+    list_cache.invalidate()
 
     return {"success": True}
@@ -1,26 +1,43 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Response
 from datetime import datetime
 
+import orjson
+
 from models.schemas import Email, EmailReply, EmailStatus, ComposeEmail
 from services.gmail_service import get_gmail_service
+from services.email_processor import process_new_emails
 from database import get_database
+from cache import list_cache
 
 router = APIRouter(prefix="/api/emails", tags=["emails"])
 
 
-@router.get("/pending", response_model=List[Email])
+@router.get("/pending")
 async def get_pending_emails():
-    """Get emails that need manual reply."""
+    """Get emails that need manual reply.
+
+    The DB rows are already in wire shape, so they go straight through
+    orjson — no per-row model validation or jsonable_encoder pass — and
+    the rendered bytes are shared across concurrent polls via a short
+    TTL cache.
+    """
     db = get_database()
-    return db.get_pending_emails()
+    payload = list_cache.get(("emails_pending",))
+    if payload is None:
+        payload = orjson.dumps(list(db.get_pending_emails()))
+        list_cache.put(("emails_pending",), payload)
+    return Response(content=payload, media_type="application/json")
 
 
-@router.get("/history", response_model=List[Email])
+@router.get("/history")
 async def get_email_history(limit: int = 50):
     """Get sent email history."""
     db = get_database()
-    return db.get_email_history(limit)
+    payload = list_cache.get(("emails_history", limit))
+    if payload is None:
+        payload = orjson.dumps(list(db.get_email_history(limit)))
+        list_cache.put(("emails_history", limit), payload)
+    return Response(content=payload, media_type="application/json")
 
 
 @router.get("/{email_id}", response_model=Email)
@@ -80,6 +97,7 @@ async def reply_to_email(email_id: str, body: dict):
 
     # Update email status
     db.update_email_status(email_id, EmailStatus.REPLIED, response_body)
+    list_cache.invalidate()
 
     return {
         "success": True,
@@ -90,10 +108,9 @@ async def reply_to_email(email_id: str, body: dict):
 @router.post("/process")
 async def trigger_email_processing():
     """Manually trigger email processing."""
-    from services.email_processor import process_new_emails
-
     try:
         processed = process_new_emails()
+        list_cache.invalidate()
         return {
             "success": True,
             "processed_count": processed
@@ -117,6 +134,7 @@ async def dismiss_email(email_id: str):
 
     # Update status to indicate it was dismissed
     db.update_email_status(email_id, EmailStatus.REPLIED, "[Dismissed by user]")
+    list_cache.invalidate()
 
     return {"success": True}
 
@@ -1,11 +1,12 @@
 import os
-import uuid
+import secrets
 from datetime import datetime
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from typing import List
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 
-from config import KNOWLEDGE_BASE_DIR
+from config import KEEP_ORIGINALS, KNOWLEDGE_BASE_DIR
 from models.schemas import KnowledgeFile
 from services.rag_service import get_rag_service
 
@@ -14,23 +15,29 @@ router = APIRouter(prefix="/api/knowledge", tags=["knowledge"])
 ALLOWED_EXTENSIONS = {".pdf", ".docx", ".doc", ".txt", ".md"}
 
 
-@router.get("/files", response_model=List[KnowledgeFile])
-async def list_files():
+@router.get("/files")
+async def list_files(request: Request):
     """List all files in the knowledge base."""
     rag = get_rag_service()
-    files = rag.list_files()
-
-    return [
-        KnowledgeFile(
-            id=f["id"],
-            filename=f["filename"],
-            file_type=f["file_type"],
-            file_size=f["file_size"],
-            chunk_count=f["chunk_count"],
-            uploaded_at=datetime.fromisoformat(f.get("uploaded_at", datetime.now().isoformat()))
-        )
-        for f in files
-    ]
+
+    # Polling clients revalidate against a cheap version key; an
+    # unchanged list costs a 304 instead of a rebuild + full payload
+    etag = rag.files_etag()
+    headers = {"ETag": etag, "Cache-Control": "max-age=5"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return ORJSONResponse([
+        {
+            "id": f["id"],
+            "filename": f["filename"],
+            "file_type": f["file_type"],
+            "file_size": f["file_size"],
+            "chunk_count": f["chunk_count"],
+            "uploaded_at": f.get("uploaded_at") or datetime.now().isoformat()
+        }
+        for f in rag.list_files()
+    ], headers=headers)
 
 
 @router.post("/upload")
@@ -48,17 +55,25 @@ async def upload_file(file: UploadFile = File(...)):
         )
 
     # Save file
-    safe_filename = f"{uuid.uuid4().hex[:8]}_{file.filename}"
+    safe_filename = f"{secrets.token_hex(4)}_{file.filename}"
     file_path = KNOWLEDGE_BASE_DIR / safe_filename
 
     try:
-        content = await file.read()
+        # Stream to disk in 1 MiB chunks instead of buffering the whole
+        # upload in memory; the blocking writes run in the threadpool so
+        # a large upload doesn't stall the event loop
         with open(file_path, "wb") as f:
-            f.write(content)
+            while chunk := await file.read(1024 * 1024):
+                await run_in_threadpool(f.write, chunk)
 
-        # Add to RAG
+        # Add to RAG (parsing + embedding is blocking and slow)
         rag = get_rag_service()
-        file_info = rag.add_document(str(file_path), safe_filename)
+        file_info = await run_in_threadpool(rag.add_document, str(file_path), safe_filename)
+
+        # The chunks are in ChromaDB now; the original is only kept for
+        # reference, so it can be dropped to save disk
+        if not KEEP_ORIGINALS and file_path.exists():
+            os.remove(file_path)
 
         return {
             "success": True,
@@ -1,23 +1,53 @@
 import google.generativeai as genai
-from typing import Optional, List
-import json
+from typing import Optional, List, Tuple
+from collections import OrderedDict
+import functools
+import re
+import threading
+
+import orjson
 
 from config import GEMINI_API_KEY
 from models.schemas import Email, EmailCategory, ClassificationResult
+from services.embedding_cache import get_embedding_cache
+
+# Bound on the in-memory query-embedding LRU; RAG queries repeat when
+# similar emails arrive close together
+_QUERY_CACHE_SIZE = 1024
 
 
 # Configure Gemini
 genai.configure(api_key=GEMINI_API_KEY)
 
+# Compiled once; strips an optional ```json ... ``` fence around the
+# model's JSON output in a single pass
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
 
-class AIService:
-    def __init__(self):
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
-        self.embedding_model = "models/gemini-embedding-001"
+# Model output labels -> category enum
+_CATEGORY_NAME_MAP = {
+    "AUTO_REPLY": EmailCategory.AUTO_REPLY,
+    "RAG_REPLY": EmailCategory.RAG_REPLY,
+    "PENDING_MANUAL": EmailCategory.PENDING_MANUAL,
+    "DRAFT_REVIEW": EmailCategory.DRAFT_REVIEW
+}
 
-    def classify_email(self, email: Email) -> ClassificationResult:
-        """Classify an email into one of four categories."""
-        prompt = f"""Analyze this email and classify it into ONE of these categories:
+
+def _parse_json_response(text: str) -> dict:
+    """Parse a model response that may be wrapped in a Markdown fence."""
+    match = _FENCE_RE.match(text)
+    if match:
+        text = match.group(1)
+    return orjson.loads(text)
+
+
+# Prompt templates are built once at import; per call only the email
+# fields are substituted instead of re-concatenating ~1 KB of invariant
+# instruction text per classification
+
+# Both classification prompts are built from one base so the category
+# definitions can never drift apart; __REPLY_FIELD__ is swapped for the
+# extra JSON field in the fused classify-and-reply variant
+_CLASSIFY_BASE = """Analyze this email and classify it into ONE of these categories:
 
 1. AUTO_REPLY: Generic/simple messages that don't need company knowledge or verification.
    Examples: "Thank you", "OK", "Got it", "Noted", "Thanks for the info", simple acknowledgments.
@@ -32,44 +62,97 @@ class AIService:
    Examples: Complex product questions, pricing inquiries, partnership requests, custom orders.
 
 EMAIL DETAILS:
-From: {email.sender_name or email.sender}
-Subject: {email.subject}
+From: {sender}
+Subject: {subject}
 Body:
-{email.body[:2000]}
+{body}
 
 Respond in this exact JSON format:
 {{
     "category": "AUTO_REPLY" or "RAG_REPLY" or "PENDING_MANUAL" or "DRAFT_REVIEW",
     "confidence": 0.0 to 1.0,
-    "reasoning": "Brief explanation of why this category was chosen"
+    "reasoning": "Brief explanation of why this category was chosen"__REPLY_FIELD__
 }}
 
 Only output the JSON, nothing else."""
 
+_CLASSIFY_TMPL = _CLASSIFY_BASE.replace("__REPLY_FIELD__", "")
+
+_CLASSIFY_REPLY_TMPL = _CLASSIFY_BASE.replace(
+    "__REPLY_FIELD__",
+    ',\n    "reply": "Only if category is AUTO_REPLY: a brief, polite response'
+    ' to the email (1-3 sentences, professional but warm, no subject line or'
+    ' signature). Otherwise null."'
+)
+
+_GENERIC_REPLY_TMPL = """Generate a brief, polite response to this simple email.
+Keep it professional but warm. 1-3 sentences max.
+
+From: {sender}
+Subject: {subject}
+Body: {body}
+
+Just write the response body, no subject line or signature."""
+
+_RAG_REPLY_TMPL = """You are a helpful customer service representative.
+Use the provided company knowledge to answer the customer's question.
+Be professional, accurate, and helpful.
+
+CUSTOMER EMAIL:
+From: {sender}
+Subject: {subject}
+Question: {body}
+
+COMPANY KNOWLEDGE BASE CONTEXT:
+{context}
+
+Instructions:
+- Answer based ONLY on the provided context
+- If the context doesn't contain relevant information, say you'll forward to the appropriate team
+- Be concise but complete
+- End with an offer to help further
+
+Write only the response body:"""
+
+_DRAFT_REPLY_TMPL = """Generate a professional response to this customer email.
+This will be reviewed by staff before sending, so be thorough but accurate.
+
+CUSTOMER EMAIL:
+From: {sender}
+Subject: {subject}
+Body: {body}
+{context_section}
+
+Instructions:
+- Write a complete, professional response
+- If you're unsure about specific details, indicate [VERIFY: detail to verify]
+- Be helpful and offer to assist further
+- Use a professional but friendly tone
+
+Write only the response body:"""
+
+
+class AIService:
+    def __init__(self):
+        self.model = genai.GenerativeModel("gemini-2.5-flash")
+        self.embedding_model = "models/gemini-embedding-001"
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+
+    def classify_email(self, email: Email) -> ClassificationResult:
+        """Classify an email into one of four categories."""
+        prompt = _CLASSIFY_TMPL.format(
+            sender=email.sender_name or email.sender,
+            subject=email.subject,
+            body=email.body[:2000]
+        )
+
         try:
             response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-
-            # Clean up response if needed
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-
-            result = json.loads(result_text.strip())
-
-            # Map category string to enum
-            category_map = {
-                "AUTO_REPLY": EmailCategory.AUTO_REPLY,
-                "RAG_REPLY": EmailCategory.RAG_REPLY,
-                "PENDING_MANUAL": EmailCategory.PENDING_MANUAL,
-                "DRAFT_REVIEW": EmailCategory.DRAFT_REVIEW
-            }
+            result = _parse_json_response(response.text)
 
             return ClassificationResult(
-                category=category_map.get(result["category"], EmailCategory.PENDING_MANUAL),
+                category=_CATEGORY_NAME_MAP.get(result["category"], EmailCategory.PENDING_MANUAL),
                 confidence=float(result.get("confidence", 0.5)),
                 reasoning=result.get("reasoning", "")
             )
@@ -83,16 +166,53 @@ Only output the JSON, nothing else."""
                 reasoning=f"Classification failed: {str(e)}"
             )
 
-    def generate_generic_reply(self, email: Email) -> str:
-        """Generate a simple reply for generic emails."""
-        prompt = f"""Generate a brief, polite response to this simple email.
-Keep it professional but warm. 1-3 sentences max.
+    def classify_and_reply(self, email: Email) -> Tuple[ClassificationResult, Optional[str]]:
+        """Classify an email and, when it's a generic AUTO_REPLY, produce
+        the reply in the same model call.
+
+        The classification prompt already contains everything a generic
+        acknowledgment needs, so fusing the two calls halves the LLM
+        round trips for the most common category. The reply slot is only
+        trusted for AUTO_REPLY; other categories need RAG context or no
+        reply at all and keep their dedicated generation calls.
+        """
+        prompt = _CLASSIFY_REPLY_TMPL.format(
+            sender=email.sender_name or email.sender,
+            subject=email.subject,
+            body=email.body[:2000]
+        )
 
-From: {email.sender_name or email.sender}
-Subject: {email.subject}
-Body: {email.body[:500]}
+        try:
+            response = self.model.generate_content(prompt)
+            result = _parse_json_response(response.text)
 
-Just write the response body, no subject line or signature."""
+            classification = ClassificationResult(
+                category=_CATEGORY_NAME_MAP.get(result["category"], EmailCategory.PENDING_MANUAL),
+                confidence=float(result.get("confidence", 0.5)),
+                reasoning=result.get("reasoning", "")
+            )
+
+            reply = result.get("reply") or None
+            if classification.category != EmailCategory.AUTO_REPLY:
+                reply = None
+
+            return classification, reply
+
+        except Exception as e:
+            print(f"Classification error: {e}")
+            return ClassificationResult(
+                category=EmailCategory.PENDING_MANUAL,
+                confidence=0.0,
+                reasoning=f"Classification failed: {str(e)}"
+            ), None
+
+    def generate_generic_reply(self, email: Email) -> str:
+        """Generate a simple reply for generic emails."""
+        prompt = _GENERIC_REPLY_TMPL.format(
+            sender=email.sender_name or email.sender,
+            subject=email.subject,
+            body=email.body[:500]
+        )
 
         try:
             response = self.model.generate_content(prompt)
@@ -103,25 +223,12 @@ Just write the response body, no subject line or signature."""
 
     def generate_rag_reply(self, email: Email, context: str) -> str:
         """Generate a reply using RAG context."""
-        prompt = f"""You are a helpful customer service representative.
-Use the provided company knowledge to answer the customer's question.
-Be professional, accurate, and helpful.
-
-CUSTOMER EMAIL:
-From: {email.sender_name or email.sender}
-Subject: {email.subject}
-Question: {email.body[:1500]}
-
-COMPANY KNOWLEDGE BASE CONTEXT:
-{context}
-
-Instructions:
-- Answer based ONLY on the provided context
-- If the context doesn't contain relevant information, say you'll forward to the appropriate team
-- Be concise but complete
-- End with an offer to help further
-
-Write only the response body:"""
+        prompt = _RAG_REPLY_TMPL.format(
+            sender=email.sender_name or email.sender,
+            subject=email.subject,
+            body=email.body[:1500],
+            context=context
+        )
 
         try:
             response = self.model.generate_content(prompt)
@@ -134,27 +241,14 @@ Write only the response body:"""
         """Generate a draft reply for review."""
         context_section = ""
         if context:
-            context_section = f"""
-AVAILABLE COMPANY INFORMATION:
-{context}
-"""
-
-        prompt = f"""Generate a professional response to this customer email.
-This will be reviewed by staff before sending, so be thorough but accurate.
-
-CUSTOMER EMAIL:
-From: {email.sender_name or email.sender}
-Subject: {email.subject}
-Body: {email.body[:2000]}
-{context_section}
+            context_section = f"\nAVAILABLE COMPANY INFORMATION:\n{context}\n"
 
-Instructions:
-- Write a complete, professional response
-- If you're unsure about specific details, indicate [VERIFY: detail to verify]
-- Be helpful and offer to assist further
-- Use a professional but friendly tone
-
-Write only the response body:"""
+        prompt = _DRAFT_REPLY_TMPL.format(
+            sender=email.sender_name or email.sender,
+            subject=email.subject,
+            body=email.body[:2000],
+            context_section=context_section
+        )
 
         try:
             response = self.model.generate_content(prompt)
@@ -165,38 +259,88 @@ Write only the response body:"""
 
     def get_embeddings(self, text: str) -> List[float]:
         """Generate embeddings for text using Gemini."""
+        cache = get_embedding_cache()
+        cached = cache.get(self.embedding_model, text)
+        if cached is not None:
+            return cached
+
         try:
             result = genai.embed_content(
                 model=self.embedding_model,
                 content=text,
                 task_type="retrieval_document"
             )
-            return result["embedding"]
+            embedding = result["embedding"]
+            cache.put(self.embedding_model, text, embedding)
+            return embedding
         except Exception as e:
             print(f"Error generating embeddings: {e}")
             return []
 
+    def get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate document embeddings for a batch of texts.
+
+        embed_content accepts a list of contents (up to 100 per request),
+        so N texts cost ceil(N/100) HTTPS round trips instead of N. Texts
+        already in the embedding cache (re-uploaded documents, unchanged
+        chunks) skip the API entirely; only misses are sent upstream.
+        Returns [] on failure, mirroring get_embeddings.
+        """
+        cache = get_embedding_cache()
+        embeddings: List[Optional[List[float]]] = [
+            cache.get(self.embedding_model, text) for text in texts
+        ]
+        misses = [i for i, vec in enumerate(embeddings) if vec is None]
+
+        try:
+            for start in range(0, len(misses), 100):
+                batch = misses[start:start + 100]
+                result = genai.embed_content(
+                    model=self.embedding_model,
+                    content=[texts[i] for i in batch],
+                    task_type="retrieval_document"
+                )
+                for i, vec in zip(batch, result["embedding"]):
+                    cache.put(self.embedding_model, texts[i], vec)
+                    embeddings[i] = vec
+            return embeddings
+        except Exception as e:
+            print(f"Error generating batch embeddings: {e}")
+            return []
+
     def get_query_embeddings(self, query: str) -> List[float]:
-        """Generate embeddings for a query."""
+        """Generate embeddings for a query.
+
+        Successful results are kept in a small LRU so repeated searches
+        for the same query text (common when similar emails arrive in a
+        burst) skip the API call; failures are never cached.
+        """
+        with self._query_cache_lock:
+            cached = self._query_cache.get(query)
+            if cached is not None:
+                self._query_cache.move_to_end(query)
+                return list(cached)
+
         try:
             result = genai.embed_content(
                 model=self.embedding_model,
                 content=query,
                 task_type="retrieval_query"
             )
-            return result["embedding"]
+            embedding = result["embedding"]
         except Exception as e:
             print(f"Error generating query embeddings: {e}")
             return []
 
+        with self._query_cache_lock:
+            self._query_cache[query] = embedding
+            if len(self._query_cache) > _QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
 
-# Singleton instance
-_ai_service: Optional[AIService] = None
+        return list(embedding)
 
 
+@functools.lru_cache(maxsize=1)
 def get_ai_service() -> AIService:
     """Get or create AI service instance."""
-    global _ai_service
-    if _ai_service is None:
-        _ai_service = AIService()
-    return _ai_service
+    return AIService()
@@ -1,3 +1,7 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Tuple, Optional
 
 from models.schemas import Email, EmailCategory, ClassificationResult
@@ -8,9 +12,36 @@ from services.rag_service import get_rag_service
 class EmailClassifier:
     """Handles email classification and response generation."""
 
+    # Enough for several poll cycles plus regenerations of recent mail
+    _RAG_CACHE_SIZE = 256
+
     def __init__(self):
         self.ai_service = get_ai_service()
         self.rag_service = get_rag_service()
+        # LRU of search contexts keyed by a digest of the email text;
+        # regenerate_response repeats process_email's search for the
+        # same email, and a hit skips the embedding + vector query
+        self._rag_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._rag_cache_lock = threading.Lock()
+
+    def _search_context(self, email: Email) -> str:
+        """RAG search with a small per-email LRU in front of it."""
+        query = email.body + " " + email.subject
+        key = hashlib.blake2b(query.encode("utf-8", "ignore"), digest_size=16).digest()
+
+        with self._rag_cache_lock:
+            context = self._rag_cache.get(key)
+            if context is not None:
+                self._rag_cache.move_to_end(key)
+                return context
+
+        context = self.rag_service.search(query)
+
+        with self._rag_cache_lock:
+            self._rag_cache[key] = context
+            if len(self._rag_cache) > self._RAG_CACHE_SIZE:
+                self._rag_cache.popitem(last=False)
+        return context
 
     def process_email(self, email: Email) -> Tuple[ClassificationResult, Optional[str]]:
         """
@@ -19,24 +50,25 @@ class EmailClassifier:
         Returns:
             Tuple of (classification_result, generated_response)
         """
-        # Step 1: Classify the email
-        classification = self.ai_service.classify_email(email)
-
-        # Step 2: Generate response based on category
-        response = None
+        # Step 1: Classify — the fused call also returns the reply for
+        # AUTO_REPLY, saving the second model round trip on the most
+        # common category
+        classification, response = self.ai_service.classify_and_reply(email)
 
+        # Step 2: Generate response for categories that need more
         if classification.category == EmailCategory.AUTO_REPLY:
-            # Generic email - generate simple reply
-            response = self.ai_service.generate_generic_reply(email)
+            # Fall back to the dedicated call if the fused reply was empty
+            if not response:
+                response = self.ai_service.generate_generic_reply(email)
 
         elif classification.category == EmailCategory.RAG_REPLY:
             # Knowledge-based question - query RAG and generate reply
-            context = self.rag_service.search(email.body + " " + email.subject)
+            context = self._search_context(email)
             response = self.ai_service.generate_rag_reply(email, context)
 
         elif classification.category == EmailCategory.DRAFT_REVIEW:
             # Generate draft for review - may use RAG context if relevant
-            context = self.rag_service.search(email.body + " " + email.subject)
+            context = self._search_context(email)
             response = self.ai_service.generate_draft_reply(email, context)
 
         elif classification.category == EmailCategory.PENDING_MANUAL:
@@ -57,13 +89,13 @@ class EmailClassifier:
             return self.ai_service.generate_generic_reply(email)
 
         elif category == EmailCategory.RAG_REPLY:
-            context = self.rag_service.search(email.body + " " + email.subject)
+            context = self._search_context(email)
             if additional_context:
                 context = f"{context}\n\nAdditional context:\n{additional_context}"
             return self.ai_service.generate_rag_reply(email, context)
 
         elif category == EmailCategory.DRAFT_REVIEW:
-            context = self.rag_service.search(email.body + " " + email.subject)
+            context = self._search_context(email)
             if additional_context:
                 context = f"{context}\n\nAdditional context:\n{additional_context}"
             return self.ai_service.generate_draft_reply(email, context)
@@ -71,13 +103,7 @@ class EmailClassifier:
         return ""
 
 
-# Singleton instance
-_classifier: Optional[EmailClassifier] = None
-
-
+@functools.lru_cache(maxsize=1)
 def get_classifier() -> EmailClassifier:
     """Get or create classifier instance."""
-    global _classifier
-    if _classifier is None:
-        _classifier = EmailClassifier()
-    return _classifier
+    return EmailClassifier()
@@ -1,9 +1,11 @@
+import functools
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
 
 from models.schemas import Email, EmailCategory, EmailStatus, EmailReply
-from services.gmail_service import get_gmail_service
+from services.gmail_service import get_gmail_service, ensure_re_prefix
 from services.classifier import get_classifier
 from database import get_database
 
@@ -25,7 +27,6 @@ def initialize_system() -> int:
 
     # Get all unread emails (up to 100)
     emails = gmail.get_unread_emails(max_results=100)
-    count = 0
 
     for email in emails:
         # Mark as seen in our database (but don't process or reply)
@@ -33,8 +34,10 @@ def initialize_system() -> int:
         email.status = EmailStatus.REPLIED  # Mark as handled
         email.ai_response = "[Skipped - existed before system start]"
         email.processed_at = datetime.now()
-        db.save_email(email)
-        count += 1
+
+    # Single transaction instead of one commit per email
+    db.save_emails(emails)
+    count = len(emails)
 
     # Mark system as initialized
     db.set_setting("system_initialized", "true")
@@ -53,36 +56,67 @@ def process_new_emails() -> int:
     classifier = get_classifier()
     db = get_database()
 
-    # Get unread emails
-    emails = gmail.get_unread_emails(max_results=20)
-    processed_count = 0
+    # Cheap id listing first; full messages are only downloaded for ids
+    # we haven't processed (manual_required mail stays unread in the
+    # inbox, so without this filter every cycle re-fetched those bodies)
+    message_ids = gmail.list_unread_ids(max_results=20)
+    new_ids = [mid for mid in message_ids if not db.is_email_processed(mid)]
 
-    for email in emails:
-        # Skip if already processed
-        if db.is_email_processed(email.id):
-            continue
+    if not new_ids:
+        return 0
+
+    new_emails = gmail.get_emails_by_ids(new_ids)
 
+    if not new_emails:
+        return 0
+
+    def _safe_process(email: Email):
         try:
-            processed_count += 1
-            process_single_email(email, gmail, classifier, db)
+            return process_single_email(email, gmail, classifier)
         except Exception as e:
             print(f"Error processing email {email.id}: {e}")
-            # Save email as pending manual on error
+            # Mark as pending manual on error; persisted with the batch
             email.category = EmailCategory.PENDING_MANUAL
             email.status = EmailStatus.MANUAL_REQUIRED
             email.processed_at = datetime.now()
-            db.save_email(email)
+            return None
+
+    # Per-email work is dominated by Gemini and Gmail round trips, so a
+    # small pool overlaps the network waits instead of paying them
+    # serially; errors stay contained per email as before
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        draft_rows = [row for row in pool.map(_safe_process, new_emails) if row]
 
-    return processed_count
+    # Replied and drafted emails get marked read in one batchModify
+    # call; manual_required mail stays unread (and visible) in the inbox
+    read_ids = [
+        e.id for e in new_emails
+        if e.status in (EmailStatus.REPLIED, EmailStatus.DRAFT)
+    ]
+    gmail.mark_as_read_bulk(read_ids)
+
+    # One transaction for the whole cycle instead of a write (and its
+    # fsync) inside every worker
+    db.save_emails(new_emails)
+    db.save_drafts(draft_rows)
+
+    return len(new_emails)
 
 
 def process_single_email(
     email: Email,
     gmail,
-    classifier,
-    db
-) -> None:
-    """Process a single email."""
+    classifier
+) -> Optional[tuple]:
+    """Process a single email.
+
+    Mutates the email's classification fields and performs the Gmail
+    side effects (reply/draft/mark-as-read); persistence is the
+    caller's job so a poll cycle can save the whole batch in one
+    transaction. Returns a (draft_id, email_id, gmail_draft_id,
+    ai_response) row for Database.save_drafts when a review draft was
+    created, else None.
+    """
 
     # Classify and generate response
     classification, response = classifier.process_email(email)
@@ -98,9 +132,8 @@ def process_single_email(
         if response:
             message_id = gmail.reply_to_email(email, response)
             if message_id:
+                # Marked as read by the caller's bulk batchModify
                 email.status = EmailStatus.REPLIED
-                # Mark original as read
-                gmail.mark_as_read(email.id)
             else:
                 # Failed to send, mark as manual
                 email.status = EmailStatus.MANUAL_REQUIRED
@@ -113,7 +146,6 @@ def process_single_email(
             message_id = gmail.reply_to_email(email, response)
             if message_id:
                 email.status = EmailStatus.REPLIED
-                gmail.mark_as_read(email.id)
             else:
                 email.status = EmailStatus.MANUAL_REQUIRED
         else:
@@ -122,14 +154,9 @@ def process_single_email(
     elif classification.category == EmailCategory.DRAFT_REVIEW:
         # Create draft for review
         if response:
-            # Prepare reply
-            subject = email.subject
-            if not subject.lower().startswith("re:"):
-                subject = f"Re: {subject}"
-
             reply = EmailReply(
                 to=email.sender,
-                subject=subject,
+                subject=ensure_re_prefix(email.subject),
                 body=response,
                 thread_id=email.thread_id
             )
@@ -139,12 +166,7 @@ def process_single_email(
             if gmail_draft_id:
                 email.status = EmailStatus.DRAFT
 
-                # Save draft info
-                draft_id = str(uuid.uuid4())
-                db.save_draft(draft_id, email.id, gmail_draft_id, response)
-
-                # Mark as read since we've processed it
-                gmail.mark_as_read(email.id)
+                return (str(uuid.uuid4()), email.id, gmail_draft_id, response)
             else:
                 email.status = EmailStatus.MANUAL_REQUIRED
         else:
@@ -155,8 +177,7 @@ def process_single_email(
         email.status = EmailStatus.MANUAL_REQUIRED
         # Don't mark as read - keep visible in inbox
 
-    # Save email to database
-    db.save_email(email)
+    return None
 
 
 class EmailPollingService:
@@ -185,13 +206,7 @@ class EmailPollingService:
             return 0
 
 
-# Singleton instance
-_polling_service: Optional[EmailPollingService] = None
-
-
+@functools.lru_cache(maxsize=1)
 def get_polling_service() -> EmailPollingService:
     """Get or create polling service."""
-    global _polling_service
-    if _polling_service is None:
-        _polling_service = EmailPollingService()
-    return _polling_service
+    return EmailPollingService()
@@ -0,0 +1,83 @@
+import functools
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from config import DATABASE_PATH, ensure_dirs
+
+
+class EmbeddingCache:
+    """SQLite-backed cache of embedding vectors keyed by text hash.
+
+    Embedding calls are the dominant cost of knowledge ingestion, and
+    re-uploading a document re-embeds chunks whose text hasn't changed.
+    Vectors are stored as float16 blobs (half the bytes of float32;
+    cosine ranking is insensitive to the precision loss) keyed by
+    SHA-256 of the text; the model name is part of the key, so
+    switching embedding models can never serve stale vectors.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        ensure_dirs()
+        self.db_path = Path(db_path) if db_path else DATABASE_PATH.parent / "embedding_cache.db"
+        self._tls = threading.local()
+        with self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    hash TEXT PRIMARY KEY,
+                    model TEXT,
+                    dim INTEGER,
+                    vec BLOB
+                )
+            """)
+
+    @contextmanager
+    def _get_connection(self):
+        """Yield this thread's long-lived connection (same pattern as
+        Database)."""
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._tls.conn = conn
+        yield conn
+
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}:{text}".encode("utf-8", "ignore")).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the cached vector for text, or None on a miss."""
+        with self._get_connection() as conn:
+            row = conn.execute(
+                "SELECT vec FROM embeddings WHERE hash = ?",
+                (self._key(model, text),)
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float16).astype(np.float32).tolist()
+
+    def put(self, model: str, text: str, vector: List[float]):
+        """Store a vector as a float16 blob under the text's hash."""
+        arr = np.asarray(vector, dtype=np.float16)
+        with self._get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+                (self._key(model, text), model, arr.shape[0], arr.tobytes())
+            )
+
+
+@functools.lru_cache(maxsize=1)
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the embedding cache instance."""
+    return EmbeddingCache()
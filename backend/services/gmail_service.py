@@ -1,12 +1,15 @@
 import base64
+import functools
+import html
 import os
-from email.message import EmailMessage
+import threading
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 import re
 
+import google_auth_httplib2
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -16,13 +19,61 @@ from googleapiclient.errors import HttpError
 from config import GMAIL_CREDENTIALS_PATH, GMAIL_TOKEN_PATH, GMAIL_SCOPES
 from models.schemas import Email, EmailAttachment, EmailReply, ComposeEmail
 
+# Compiled once; both run for every parsed message
+_SENDER_RE = re.compile(r"(.+?)\s*<(.+?)>")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+def ensure_re_prefix(subject: str) -> str:
+    """Prefix a subject with "Re: " unless it already has one.
+
+    Only the first three characters are lowercased for the check,
+    instead of copying the whole subject like .lower().startswith did
+    at every call site.
+    """
+    if subject[:3].lower() == "re:":
+        return subject
+    return f"Re: {subject}"
+
+
+# selectolax (lexbor) extracts text from real-world HTML much faster and
+# more correctly than a tag-stripping regex (scripts/styles, broken
+# markup); fall back to the regex if it isn't installed
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
 
 class GmailService:
     def __init__(self):
-        self.service = None
+        self._creds = None
+        self._tls = threading.local()
         self.user_email = None
         self._authenticate()
 
+    @property
+    def service(self):
+        """This thread's Gmail client, built on first use.
+
+        httplib2 transports are not thread-safe, and the poll loop now
+        issues requests from a thread pool — so each thread gets its own
+        AuthorizedHttp over the shared credentials (google-auth
+        serializes token refresh internally). static_discovery avoids
+        re-downloading the discovery document per client.
+        """
+        service = getattr(self._tls, "service", None)
+        if service is None:
+            authed_http = google_auth_httplib2.AuthorizedHttp(
+                self._creds, http=httplib2.Http()
+            )
+            service = build(
+                "gmail", "v1",
+                http=authed_http,
+                static_discovery=True
+            )
+            self._tls.service = service
+        return service
+
     def _authenticate(self):
         """Authenticate with Gmail API."""
         creds = None
@@ -47,28 +98,68 @@ class GmailService:
             with open(GMAIL_TOKEN_PATH, "w") as token:
                 token.write(creds.to_json())
 
-        self.service = build("gmail", "v1", credentials=creds)
+        self._creds = creds
 
-        # Get user email
+        # Get user email (also builds this thread's client)
         profile = self.service.users().getProfile(userId="me").execute()
         self.user_email = profile.get("emailAddress")
 
-    def get_unread_emails(self, max_results: int = 50) -> List[Email]:
-        """Fetch unread emails from inbox."""
+    def list_unread_ids(self, max_results: int = 50) -> List[str]:
+        """List unread message ids without fetching any content.
+
+        The cheap first phase of polling: callers filter out ids they
+        have already processed before paying to download full messages.
+        """
         try:
             results = self.service.users().messages().list(
                 userId="me",
                 labelIds=["INBOX", "UNREAD"],
                 maxResults=max_results
             ).execute()
+            return [msg["id"] for msg in results.get("messages", [])]
 
-            messages = results.get("messages", [])
-            emails = []
+        except HttpError as error:
+            print(f"Error listing emails: {error}")
+            return []
+
+    def get_emails_by_ids(self, message_ids: List[str]) -> List[Email]:
+        """Batch-fetch full messages for the given ids.
+
+        One batched HTTP request instead of a serial round trip per
+        message (the batch API accepts up to 100 calls; poll sizes never
+        exceed that).
+        """
+        if not message_ids:
+            return []
 
-            for msg in messages:
-                email = self._get_email_details(msg["id"])
-                if email:
-                    emails.append(email)
+        try:
+            responses: Dict[str, Any] = {}
+
+            def _collect(request_id, response, exception):
+                if exception is not None:
+                    print(f"Error fetching message {request_id}: {exception}")
+                else:
+                    responses[request_id] = response
+
+            batch = self.service.new_batch_http_request(callback=_collect)
+            for message_id in message_ids:
+                batch.add(
+                    self.service.users().messages().get(
+                        userId="me",
+                        id=message_id,
+                        format="full"
+                    ),
+                    request_id=message_id
+                )
+            batch.execute()
+
+            emails = []
+            for message_id in message_ids:
+                message = responses.get(message_id)
+                if message:
+                    email = self._message_to_email(message)
+                    if email:
+                        emails.append(email)
 
             return emails
 
@@ -76,15 +167,14 @@ class GmailService:
             print(f"Error fetching emails: {error}")
             return []
 
-    def _get_email_details(self, message_id: str) -> Optional[Email]:
-        """Get full details of an email."""
-        try:
-            message = self.service.users().messages().get(
-                userId="me",
-                id=message_id,
-                format="full"
-            ).execute()
+    def get_unread_emails(self, max_results: int = 50) -> List[Email]:
+        """Fetch unread emails from inbox."""
+        return self.get_emails_by_ids(self.list_unread_ids(max_results))
 
+    def _message_to_email(self, message: Dict[str, Any]) -> Optional[Email]:
+        """Parse a full message resource into an Email."""
+        try:
+            message_id = message["id"]
             headers = message.get("payload", {}).get("headers", [])
             header_dict = {h["name"].lower(): h["value"] for h in headers}
 
@@ -92,14 +182,14 @@ class GmailService:
             sender = header_dict.get("from", "")
             sender_name = None
             if "<" in sender:
-                match = re.match(r"(.+?)\s*<(.+?)>", sender)
+                match = _SENDER_RE.match(sender)
                 if match:
                     sender_name = match.group(1).strip().strip('"')
                     sender = match.group(2)
 
             # Extract body and attachments
             body, body_html, attachments = self._extract_body_and_attachments(
-                message.get("payload", {}), message_id
+                message.get("payload", {})
             )
 
             # Parse date
@@ -123,34 +213,37 @@ class GmailService:
             print(f"Error getting email details: {error}")
             return None
 
-    def _extract_body_and_attachments(
-        self, payload: Dict[str, Any], message_id: str
-    ) -> tuple:
+    def _extract_body_and_attachments(self, payload: Dict[str, Any]) -> tuple:
         """Extract body text and attachments from email payload."""
         body = ""
         body_html = ""
         attachments = []
 
-        def process_part(part):
-            nonlocal body, body_html, attachments
+        # Handle single-part messages
+        if "body" in payload and payload.get("body", {}).get("data"):
+            data = payload["body"]["data"]
+            body = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
+
+        # Walk the MIME tree with an explicit stack instead of per-part
+        # recursion: no Python frame per nesting level, no recursion
+        # limit on pathological mails. Reversed pushes keep the original
+        # depth-first part order.
+        stack = list(reversed(payload.get("parts", [])))
+        while stack:
+            part = stack.pop()
 
             mime_type = part.get("mimeType", "")
             filename = part.get("filename", "")
 
             if filename and part.get("body", {}).get("attachmentId"):
-                # This is an attachment
-                attachment_id = part["body"]["attachmentId"]
-                attachment_data = self.service.users().messages().attachments().get(
-                    userId="me",
-                    messageId=message_id,
-                    id=attachment_id
-                ).execute()
-
+                # Record attachment metadata only; content is fetched on
+                # demand via get_attachment_content instead of costing an
+                # API call (and the bytes) for every polled message
                 attachments.append(EmailAttachment(
                     filename=filename,
                     mime_type=mime_type,
                     size=part["body"].get("size", 0),
-                    content=attachment_data.get("data", "")
+                    attachment_id=part["body"]["attachmentId"]
                 ))
             elif mime_type == "text/plain":
                 data = part.get("body", {}).get("data", "")
@@ -161,41 +254,50 @@ class GmailService:
                 if data:
                     body_html = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
             elif "parts" in part:
-                for sub_part in part["parts"]:
-                    process_part(sub_part)
-
-        # Handle single-part messages
-        if "body" in payload and payload.get("body", {}).get("data"):
-            data = payload["body"]["data"]
-            body = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
-
-        # Handle multi-part messages
-        if "parts" in payload:
-            for part in payload["parts"]:
-                process_part(part)
+                stack.extend(reversed(part["parts"]))
 
         # Fall back to HTML if no plain text
         if not body and body_html:
-            # Simple HTML to text conversion
-            body = re.sub(r"<[^>]+>", "", body_html)
-            body = body.replace("&nbsp;", " ").replace("&amp;", "&")
+            if HTMLParser is not None:
+                body = HTMLParser(body_html).text(separator=" ")
+            else:
+                # Simple HTML to text conversion; html.unescape covers
+                # all entities, not just a hand-picked few
+                body = html.unescape(_HTML_TAG_RE.sub("", body_html))
 
         return body.strip(), body_html, attachments
 
+    def _build_raw_message(
+        self,
+        to: str,
+        subject: str,
+        body: str,
+        cc: Optional[str] = None,
+        bcc: Optional[str] = None
+    ) -> str:
+        """Build a base64url-encoded RFC 2822 message.
+
+        All replies and drafts are plain text, so a single MIMEText is
+        enough; the MIMEMultipart('alternative') wrapper each caller
+        used to build held exactly one part and only added boundary
+        generation and extra bytes on the wire.
+        """
+        message = MIMEText(body, "plain")
+        message["To"] = to
+        message["From"] = self.user_email
+        message["Subject"] = subject
+
+        if cc:
+            message["Cc"] = cc
+        if bcc:
+            message["Bcc"] = bcc
+
+        return base64.urlsafe_b64encode(message.as_bytes()).decode()
+
     def send_email(self, reply: EmailReply) -> Optional[str]:
         """Send an email."""
         try:
-            message = MIMEMultipart("alternative")
-            message["To"] = reply.to
-            message["From"] = self.user_email
-            message["Subject"] = reply.subject
-
-            # Add plain text body
-            text_part = MIMEText(reply.body, "plain")
-            message.attach(text_part)
-
-            # Encode and send
-            encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            encoded_message = self._build_raw_message(reply.to, reply.subject, reply.body)
             create_message = {"raw": encoded_message}
 
             # If replying to a thread
@@ -215,14 +317,9 @@ class GmailService:
 
     def reply_to_email(self, original_email: Email, response_body: str) -> Optional[str]:
         """Reply to an existing email thread."""
-        # Prepare reply subject
-        subject = original_email.subject
-        if not subject.lower().startswith("re:"):
-            subject = f"Re: {subject}"
-
         reply = EmailReply(
             to=original_email.sender,
-            subject=subject,
+            subject=ensure_re_prefix(original_email.subject),
             body=response_body,
             thread_id=original_email.thread_id
         )
@@ -232,23 +329,13 @@ class GmailService:
     def send_composed_email(self, compose: ComposeEmail) -> Optional[str]:
         """Send a composed email with CC/BCC support."""
         try:
-            message = MIMEMultipart("alternative")
-            message["From"] = self.user_email
-            message["To"] = ", ".join(compose.to)
-            message["Subject"] = compose.subject
-
-            if compose.cc:
-                message["Cc"] = ", ".join(compose.cc)
-
-            if compose.bcc:
-                message["Bcc"] = ", ".join(compose.bcc)
-
-            # Add plain text body
-            text_part = MIMEText(compose.body, "plain")
-            message.attach(text_part)
-
-            # Encode and send
-            encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            encoded_message = self._build_raw_message(
+                ", ".join(compose.to),
+                compose.subject,
+                compose.body,
+                cc=", ".join(compose.cc) if compose.cc else None,
+                bcc=", ".join(compose.bcc) if compose.bcc else None
+            )
             create_message = {"raw": encoded_message}
 
             sent_message = self.service.users().messages().send(
@@ -265,15 +352,7 @@ class GmailService:
     def create_draft(self, reply: EmailReply) -> Optional[str]:
         """Create a draft email."""
         try:
-            message = MIMEMultipart("alternative")
-            message["To"] = reply.to
-            message["From"] = self.user_email
-            message["Subject"] = reply.subject
-
-            text_part = MIMEText(reply.body, "plain")
-            message.attach(text_part)
-
-            encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            encoded_message = self._build_raw_message(reply.to, reply.subject, reply.body)
 
             draft_body = {
                 "message": {
@@ -295,6 +374,36 @@ class GmailService:
             print(f"Error creating draft: {error}")
             return None
 
+    def update_draft(self, draft_id: str, reply: EmailReply) -> Optional[str]:
+        """Replace a draft's content in place.
+
+        One drafts().update round trip instead of delete + create, and
+        Gmail keeps the same draft id so callers don't have to re-link.
+        """
+        try:
+            encoded_message = self._build_raw_message(reply.to, reply.subject, reply.body)
+
+            draft_body = {
+                "message": {
+                    "raw": encoded_message
+                }
+            }
+
+            if reply.thread_id:
+                draft_body["message"]["threadId"] = reply.thread_id
+
+            draft = self.service.users().drafts().update(
+                userId="me",
+                id=draft_id,
+                body=draft_body
+            ).execute()
+
+            return draft.get("id")
+
+        except HttpError as error:
+            print(f"Error updating draft: {error}")
+            return None
+
     def send_draft(self, draft_id: str) -> Optional[str]:
         """Send a previously created draft."""
         try:
@@ -334,6 +443,24 @@ class GmailService:
             print(f"Error marking as read: {error}")
             return False
 
+    def mark_as_read_bulk(self, message_ids: List[str]) -> bool:
+        """Mark several messages as read in one batchModify call.
+
+        batchModify takes up to 1000 ids, so a whole poll cycle's worth
+        of reads costs one round trip instead of one per message.
+        """
+        if not message_ids:
+            return True
+        try:
+            self.service.users().messages().batchModify(
+                userId="me",
+                body={"ids": message_ids, "removeLabelIds": ["UNREAD"]}
+            ).execute()
+            return True
+        except HttpError as error:
+            print(f"Error bulk marking as read: {error}")
+            return False
+
     def get_attachment_content(self, message_id: str, attachment_id: str) -> Optional[bytes]:
         """Download attachment content."""
         try:
@@ -343,7 +470,9 @@ class GmailService:
                 id=attachment_id
             ).execute()
 
-            data = attachment.get("data", "")
+            data = attachment.get("data")
+            if not data:
+                return None
             return base64.urlsafe_b64decode(data)
 
         except HttpError as error:
@@ -351,13 +480,11 @@ class GmailService:
             return None
 
 
-# Singleton instance
-_gmail_service: Optional[GmailService] = None
-
-
+@functools.lru_cache(maxsize=1)
 def get_gmail_service() -> GmailService:
-    """Get or create Gmail service instance."""
-    global _gmail_service
-    if _gmail_service is None:
-        _gmail_service = GmailService()
-    return _gmail_service
+    """Get or create Gmail service instance.
+
+    lru_cache makes first-use construction thread-safe, unlike the
+    check-then-set global it replaces (see get_database).
+    """
+    return GmailService()
@@ -1,17 +1,151 @@
+import atexit
+import functools
+import mmap
 import os
+import re
+import threading
 import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 import chromadb
+import numpy as np
+import orjson
 import PyPDF2
 from docx import Document
-import json
+
+# PDFium (C++ via ctypes) parses PDFs an order of magnitude faster than
+# pure-Python PyPDF2; fall back to PyPDF2 if it's unavailable or chokes
+# on a particular file
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
 
 from config import CHROMA_PERSIST_DIR, KNOWLEDGE_BASE_DIR
 from services.ai_service import get_ai_service
 
 
+# Word boundaries for offset-based chunking
+_WORD_RE = re.compile(r"\S+")
+
+# Semantic query-cache tuning: near-match threshold and how many recent
+# query embeddings to keep for cosine lookup
+_QUERY_SIM_THRESHOLD = 0.97
+_QUERY_CACHE_RECENT = 256
+
+# Chunks staged across documents before one collection.upsert
+_INGEST_BATCH = 512
+
+
+# Extraction and chunking live at module level so ProcessPoolExecutor
+# can pickle them; worker processes never construct Chroma or Gemini
+# clients
+
+def _extract_pdf(file_path: str) -> str:
+    """Extract text from a PDF (pypdfium2, PyPDF2 fallback)."""
+    if pdfium is not None:
+        try:
+            pdf = pdfium.PdfDocument(file_path)
+            try:
+                return "\n".join(
+                    page.get_textpage().get_text_range() for page in pdf
+                ).strip()
+            finally:
+                pdf.close()
+        except Exception as e:
+            print(f"pypdfium2 failed, falling back to PyPDF2: {e}")
+
+    # List append + single join; += concatenation is quadratic in
+    # total text size
+    parts = []
+    try:
+        with open(file_path, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            for page in reader.pages:
+                parts.append(page.extract_text())
+    except Exception as e:
+        print(f"Error extracting PDF: {e}")
+    return "\n".join(parts).strip()
+
+
+def _extract_docx(file_path: str) -> str:
+    """Extract text from a DOCX file."""
+    parts = []
+    try:
+        doc = Document(file_path)
+        for para in doc.paragraphs:
+            parts.append(para.text)
+    except Exception as e:
+        print(f"Error extracting DOCX: {e}")
+    return "\n".join(parts).strip()
+
+
+def _extract_txt(file_path: str) -> str:
+    """Extract text from a plain text file.
+
+    Memory-maps the file and decodes once, so large uploads share the
+    kernel page cache instead of going through buffered text-mode
+    reads; undecodable bytes are replaced rather than failing the whole
+    ingest.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:].decode("utf-8", errors="replace").strip()
+    except Exception as e:
+        print(f"Error reading TXT: {e}")
+        return ""
+
+
+# Extension -> extractor; unknown types are tried as plain text
+_EXTRACTORS = {
+    ".pdf": _extract_pdf,
+    ".docx": _extract_docx,
+    ".doc": _extract_docx,
+    ".txt": _extract_txt,
+}
+
+
+def _extract_text(file_path: str) -> str:
+    """Extract text based on file type."""
+    ext = os.path.splitext(file_path)[1].lower()
+    return _EXTRACTORS.get(ext, _extract_txt)(file_path)
+
+
+def _chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+    """Split text into overlapping chunks.
+
+    Chunks are sliced straight out of the original text using word
+    offsets instead of join()ing word lists, so chunking stays O(N) in
+    document size rather than rebuilding every chunk string.
+    """
+    if not text:
+        return []
+
+    spans = [m.span() for m in _WORD_RE.finditer(text)]
+    if not spans:
+        return []
+
+    chunks = []
+    for i in range(0, len(spans), chunk_size - overlap):
+        start = spans[i][0]
+        end = spans[min(i + chunk_size, len(spans)) - 1][1]
+        chunks.append(text[start:end])
+
+    return chunks
+
+
+def _extract_and_chunk(args: Tuple[str, str]) -> Tuple[str, str, List[str]]:
+    """Process-pool worker: parse and chunk one file (CPU-bound half)."""
+    file_path, filename = args
+    return file_path, filename, _chunk_text(_extract_text(file_path))
+
+
 class RAGService:
     """RAG pipeline using ChromaDB for vector storage."""
 
@@ -23,73 +157,116 @@ class RAGService:
         self.client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
 
         # Get or create collection
+        # Vectors are L2-normalized at ingest, so inner product equals
+        # cosine and the index skips per-query norm computation
         self.collection = self.client.get_or_create_collection(
             name="knowledge_base",
-            metadata={"description": "Company knowledge base documents"}
+            metadata={
+                "description": "Company knowledge base documents",
+                "hnsw:space": "ip"
+            }
         )
 
-        # Track files metadata
-        self.metadata_file = Path(CHROMA_PERSIST_DIR) / "files_metadata.json"
+        # Track files metadata in an append-only JSONL log: each add or
+        # delete writes one line instead of rewriting the whole file
+        self.metadata_file = Path(CHROMA_PERSIST_DIR) / "files_metadata.jsonl"
+        self._legacy_metadata_file = Path(CHROMA_PERSIST_DIR) / "files_metadata.json"
         self.files_metadata = self._load_metadata()
 
+        # Semantic search cache: exact query string -> context, plus the
+        # last few query embeddings for cosine near-match lookups.
+        # Cleared whenever the knowledge base changes. search() runs
+        # concurrently from the poll cycle's worker pool, so all shared
+        # state below is lock-guarded (same idiom as AIService's query
+        # cache and the classifier's RAG cache).
+        self._cache_lock = threading.Lock()
+        self._search_exact: Dict[str, str] = {}
+        self._search_recent: "deque[Tuple[np.ndarray, str]]" = deque(
+            maxlen=_QUERY_CACHE_RECENT
+        )
+
+        # In-process copy of all chunk vectors as one row-normalized
+        # (N, d) float32 matrix; scoring it with a single BLAS
+        # matrix-vector product answers most searches without a Chroma
+        # query. Rebuilt lazily after the knowledge base changes.
+        self._index_lock = threading.Lock()
+        self._vec_matrix: Optional[np.ndarray] = None
+        self._vec_docs: List[str] = []
+        self._vec_metas: List[Dict[str, Any]] = []
+
+        # Chunks staged across documents and written with one upsert,
+        # amortizing Chroma's per-call overhead when many small files
+        # are ingested together. Flushed when the buffer fills, when an
+        # ingest finishes, and before any read of the collection.
+        self._pending_lock = threading.Lock()
+        self._pending: Dict[str, list] = {
+            "ids": [], "embs": [], "docs": [], "metas": []
+        }
+        atexit.register(self._flush)
+
     def _load_metadata(self) -> Dict[str, Any]:
-        """Load files metadata from disk."""
+        """Rebuild files metadata by replaying the append-only log.
+
+        A files_metadata.json left by the old full-rewrite format is
+        migrated into the log on first load.
+        """
+        self._tombstones = 0
+        metadata: Dict[str, Any] = {}
+
+        if not self.metadata_file.exists() and self._legacy_metadata_file.exists():
+            with open(self._legacy_metadata_file, "rb") as f:
+                metadata = orjson.loads(f.read())
+            self._rewrite_log(metadata)
+            self._legacy_metadata_file.unlink()
+            return metadata
+
         if self.metadata_file.exists():
-            with open(self.metadata_file, "r") as f:
-                return json.load(f)
-        return {}
+            with open(self.metadata_file, "rb") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = orjson.loads(line)
+                    if record.get("op") == "del":
+                        metadata.pop(record["id"], None)
+                        self._tombstones += 1
+                    else:
+                        record.pop("op", None)
+                        metadata[record["id"]] = record
+
+        return metadata
+
+    def _append_log(self, record: Dict[str, Any]):
+        """Append one operation to the metadata log."""
+        os.makedirs(os.path.dirname(self.metadata_file), exist_ok=True)
+        with open(self.metadata_file, "ab") as f:
+            f.write(orjson.dumps(record) + b"\n")
 
-    def _save_metadata(self):
-        """Save files metadata to disk."""
+    def _rewrite_log(self, metadata: Dict[str, Any]):
+        """Compact the log to just the live records (atomic replace)."""
         os.makedirs(os.path.dirname(self.metadata_file), exist_ok=True)
-        with open(self.metadata_file, "w") as f:
-            json.dump(self.files_metadata, f, indent=2)
+        tmp = self.metadata_file.with_suffix(".jsonl.tmp")
+        with open(tmp, "wb") as f:
+            for file_info in metadata.values():
+                f.write(orjson.dumps(file_info) + b"\n")
+        os.replace(tmp, self.metadata_file)
+        self._tombstones = 0
 
     def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file."""
-        text = ""
-        try:
-            with open(file_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-        except Exception as e:
-            print(f"Error extracting PDF: {e}")
-        return text.strip()
+        """Extract text from PDF file (pypdfium2, PyPDF2 fallback)."""
+        return _extract_pdf(file_path)
 
     def extract_text_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file."""
-        text = ""
-        try:
-            doc = Document(file_path)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        except Exception as e:
-            print(f"Error extracting DOCX: {e}")
-        return text.strip()
+        return _extract_docx(file_path)
 
     def extract_text_from_txt(self, file_path: str) -> str:
         """Extract text from TXT file."""
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read().strip()
-        except Exception as e:
-            print(f"Error reading TXT: {e}")
-            return ""
+        return _extract_txt(file_path)
 
     def extract_text(self, file_path: str) -> str:
         """Extract text based on file type."""
-        ext = Path(file_path).suffix.lower()
-
-        if ext == ".pdf":
-            return self.extract_text_from_pdf(file_path)
-        elif ext in [".docx", ".doc"]:
-            return self.extract_text_from_docx(file_path)
-        elif ext == ".txt":
-            return self.extract_text_from_txt(file_path)
-        else:
-            # Try as plain text
-            return self.extract_text_from_txt(file_path)
+        return _extract_text(file_path)
 
     def chunk_text(
         self,
@@ -98,50 +275,81 @@ class RAGService:
         overlap: int = 50
     ) -> List[str]:
         """Split text into overlapping chunks."""
-        if not text:
-            return []
-
-        words = text.split()
-        chunks = []
-
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i:i + chunk_size])
-            if chunk.strip():
-                chunks.append(chunk)
-
-        return chunks
+        return _chunk_text(text, chunk_size, overlap)
 
     def add_document(self, file_path: str, filename: str) -> Dict[str, Any]:
         """Add a document to the knowledge base."""
-        file_id = str(uuid.uuid4())
-
-        # Extract text
-        text = self.extract_text(file_path)
+        text = _extract_text(file_path)
         if not text:
             raise ValueError(f"Could not extract text from {filename}")
 
-        # Chunk text
-        chunks = self.chunk_text(text)
-
-        # Generate embeddings and add to ChromaDB
-        chunk_ids = []
-        for i, chunk in enumerate(chunks):
-            chunk_id = f"{file_id}_chunk_{i}"
-            chunk_ids.append(chunk_id)
-
-            # Get embeddings from AI service
-            embeddings = self.ai_service.get_embeddings(chunk)
+        file_info = self._index_chunks(file_path, filename, _chunk_text(text))
+        self._flush()
+        return file_info
 
+    def add_documents(self, files: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Ingest several (file_path, filename) pairs at once.
+
+        Extraction is CPU-bound (PDF parsing) so it fans out across a
+        process pool; the pool keeps parsing the next files while this
+        thread embeds and indexes the previous one, overlapping the CPU
+        and network halves of the pipeline. Embedding and Chroma writes
+        stay on this thread because the Chroma client is not safe for
+        concurrent writes. Worker count is os.cpu_count()-1 or the
+        INGEST_N_PROCS env var.
+        """
+        workers = int(
+            os.getenv("INGEST_N_PROCS") or max(1, (os.cpu_count() or 2) - 1)
+        )
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for file_path, filename, chunks in pool.map(_extract_and_chunk, files):
+                if not chunks:
+                    print(f"Could not extract text from {filename}")
+                    continue
+                results.append(self._index_chunks(file_path, filename, chunks))
+        self._flush()
+        return results
+
+    def _index_chunks(
+        self,
+        file_path: str,
+        filename: str,
+        chunks: List[str]
+    ) -> Dict[str, Any]:
+        """Embed chunks, insert them into Chroma and record file metadata."""
+        file_id = str(uuid.uuid4())
+        total_chunks = len(chunks)
+
+        # One batched embedding request and one collection.add for the
+        # whole document, instead of an HTTPS round trip plus an index
+        # insert per chunk
+        chunk_ids = [f"{file_id}_chunk_{i}" for i in range(total_chunks)]
+        metadatas = [
+            {
+                "file_id": file_id,
+                "filename": filename,
+                "chunk_index": i,
+                "total_chunks": total_chunks
+            }
+            for i in range(total_chunks)
+        ]
+        embeddings = self.ai_service.get_embeddings_batch(chunks)
+
+        if embeddings:
+            # Stored vectors are immutable, so normalize once here;
+            # cosine then reduces to a plain dot product at query time
+            arr = np.asarray(embeddings, dtype=np.float32)
+            arr /= np.linalg.norm(arr, axis=1, keepdims=True) + 1e-12
+            self._stage(chunk_ids, arr.tolist(), chunks, metadatas)
+        else:
+            # Embedding failed; let Chroma embed these chunks itself and
+            # keep them out of the staged batch
+            self._flush()
             self.collection.add(
-                ids=[chunk_id],
-                embeddings=[embeddings] if embeddings else None,
-                documents=[chunk],
-                metadatas=[{
-                    "file_id": file_id,
-                    "filename": filename,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks)
-                }]
+                ids=chunk_ids,
+                documents=chunks,
+                metadatas=metadatas
             )
 
         # Save file metadata
@@ -151,12 +359,13 @@ class RAGService:
             "file_path": str(file_path),
             "file_type": Path(filename).suffix.lower(),
             "file_size": os.path.getsize(file_path),
-            "chunk_count": len(chunks),
+            "chunk_count": total_chunks,
             "chunk_ids": chunk_ids,
             "uploaded_at": datetime.now().isoformat()
         }
         self.files_metadata[file_id] = file_info
-        self._save_metadata()
+        self._append_log({"op": "add", **file_info})
+        self._invalidate_search_cache()
 
         return file_info
 
@@ -167,8 +376,10 @@ class RAGService:
 
         file_info = self.files_metadata[file_id]
 
-        # Delete chunks from ChromaDB
+        # Delete chunks from ChromaDB (staged chunks first, so a just-
+        # ingested file can be deleted)
         try:
+            self._flush()
             self.collection.delete(ids=file_info["chunk_ids"])
             print(f"Deleted {len(file_info['chunk_ids'])} chunks from ChromaDB")
         except Exception as e:
@@ -196,37 +407,83 @@ class RAGService:
         if not deleted_file:
             print(f"File not found on disk: {file_info['filename']}")
 
-        # Delete from metadata
+        # Delete from metadata; compact the log once tombstones dominate
         del self.files_metadata[file_id]
-        self._save_metadata()
+        self._append_log({"op": "del", "id": file_id})
+        self._tombstones += 1
+        if self._tombstones > max(16, len(self.files_metadata)):
+            self._rewrite_log(self.files_metadata)
+        self._invalidate_search_cache()
         print(f"Deleted metadata for: {file_info['filename']}")
 
         return True
 
     def search(self, query: str, n_results: int = 5) -> str:
-        """Search knowledge base and return relevant context."""
+        """Search knowledge base and return relevant context.
+
+        Repeated questions are common in a mail workload, so results are
+        cached: an exact-string hit returns instantly, and a query whose
+        embedding is nearly identical (cosine > 0.97) to a recent one
+        reuses that result instead of re-querying Chroma.
+        """
+        self._flush()
         if self.collection.count() == 0:
             return "No knowledge base documents available."
 
+        with self._cache_lock:
+            cached = self._search_exact.get(query)
+            # Snapshot under the lock; iterating the live deque would race
+            # concurrent appends from other pool workers
+            recent = list(self._search_recent)
+        if cached is not None:
+            return cached
+
         try:
             # Get query embeddings
             query_embedding = self.ai_service.get_query_embeddings(query)
 
+            q = None
             if query_embedding:
-                results = self.collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=n_results
-                )
-            else:
-                # Fallback to text search
-                results = self.collection.query(
-                    query_texts=[query],
-                    n_results=n_results
-                )
-
-            # Format results
-            documents = results.get("documents", [[]])[0]
-            metadatas = results.get("metadatas", [[]])[0]
+                q = np.asarray(query_embedding, dtype=np.float32)
+                norm = np.linalg.norm(q)
+                if norm:
+                    q = q / norm
+                    for vec, context in recent:
+                        if float(vec @ q) > _QUERY_SIM_THRESHOLD:
+                            self._cache_search(query, context, None)
+                            return context
+                else:
+                    q = None
+
+            documents = metadatas = None
+            if q is not None:
+                prefiltered = self._query_vec_index(q, n_results)
+                if prefiltered is not None:
+                    documents, metadatas = prefiltered
+
+            if documents is None:
+                if q is not None:
+                    # Normalized query: inner-product space makes this a
+                    # pure dot-product ranking
+                    results = self.collection.query(
+                        query_embeddings=[q.tolist()],
+                        n_results=n_results
+                    )
+                elif query_embedding:
+                    results = self.collection.query(
+                        query_embeddings=[query_embedding],
+                        n_results=n_results
+                    )
+                else:
+                    # Fallback to text search
+                    results = self.collection.query(
+                        query_texts=[query],
+                        n_results=n_results
+                    )
+
+                # Format results
+                documents = results.get("documents", [[]])[0]
+                metadatas = results.get("metadatas", [[]])[0]
 
             if not documents:
                 return "No relevant information found in knowledge base."
@@ -236,31 +493,139 @@ class RAGService:
                 source = meta.get("filename", "Unknown")
                 context_parts.append(f"[Source: {source}]\n{doc}")
 
-            return "\n\n---\n\n".join(context_parts)
+            context = "\n\n---\n\n".join(context_parts)
+            self._cache_search(query, context, q)
+            return context
 
         except Exception as e:
             print(f"Search error: {e}")
             return "Error searching knowledge base."
 
+    def _cache_search(self, query: str, context: str, q: "Optional[np.ndarray]"):
+        """Record a search result for exact and near-match reuse."""
+        with self._cache_lock:
+            if len(self._search_exact) >= 1024:
+                self._search_exact.clear()
+            self._search_exact[query] = context
+            if q is not None:
+                self._search_recent.append((q, context))
+
+    def _stage(self, ids: List[str], embeddings: List[List[float]],
+               documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Queue chunks for the next batched upsert."""
+        with self._pending_lock:
+            self._pending["ids"].extend(ids)
+            self._pending["embs"].extend(embeddings)
+            self._pending["docs"].extend(documents)
+            self._pending["metas"].extend(metadatas)
+            full = len(self._pending["ids"]) >= _INGEST_BATCH
+        if full:
+            self._flush()
+
+    def _flush(self):
+        """Write all staged chunks to Chroma in one upsert.
+
+        The buffer is swapped out under the lock and written outside it,
+        so concurrent flushes each take their own batch and staging never
+        blocks on the Chroma write.
+        """
+        with self._pending_lock:
+            if not self._pending["ids"]:
+                return
+            pending = self._pending
+            self._pending = {"ids": [], "embs": [], "docs": [], "metas": []}
+        self.collection.upsert(
+            ids=pending["ids"],
+            embeddings=pending["embs"],
+            documents=pending["docs"],
+            metadatas=pending["metas"]
+        )
+
+    def _invalidate_search_cache(self):
+        """Drop cached search results after the knowledge base changes."""
+        with self._cache_lock:
+            self._search_exact.clear()
+            self._search_recent.clear()
+        with self._index_lock:
+            self._vec_matrix = None
+
+    def _refresh_vec_index(self):
+        """Rebuild the in-process chunk-vector matrix from Chroma.
+
+        Caller must hold _index_lock.
+        """
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = data.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            self._vec_matrix = None
+            self._vec_docs = []
+            self._vec_metas = []
+            return
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        self._vec_matrix = matrix
+        self._vec_docs = data.get("documents") or []
+        self._vec_metas = data.get("metadatas") or []
+
+    def _query_vec_index(
+        self,
+        q: "np.ndarray",
+        n_results: int
+    ) -> Optional[Tuple[List[str], List[Dict[str, Any]]]]:
+        """Score every chunk with one matrix-vector product and return
+        the top documents, or None if the index can't serve the query."""
+        try:
+            # One lock for rebuild and lookup so a concurrent invalidation
+            # can't swap the matrix out from under the doc/meta lists
+            with self._index_lock:
+                if self._vec_matrix is None:
+                    self._refresh_vec_index()
+                matrix = self._vec_matrix
+                if matrix is None or len(self._vec_docs) != matrix.shape[0]:
+                    return None
+                docs = self._vec_docs
+                metas = self._vec_metas
+
+            scores = matrix @ q
+            k = min(n_results, scores.shape[0])
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            return (
+                [docs[i] for i in top],
+                [metas[i] for i in top]
+            )
+        except Exception as e:
+            print(f"Vector index error: {e}")
+            return None
+
     def list_files(self) -> List[Dict[str, Any]]:
         """List all files in the knowledge base."""
         return list(self.files_metadata.values())
 
+    def files_etag(self) -> str:
+        """Cheap version key for the file list.
+
+        Count plus newest upload time changes whenever a file is added or
+        removed, so polling clients can revalidate with If-None-Match
+        instead of re-downloading an unchanged list.
+        """
+        newest = max(
+            (f.get("uploaded_at", "") for f in self.files_metadata.values()),
+            default=""
+        )
+        return f'"{len(self.files_metadata)}-{newest}"'
+
     def get_stats(self) -> Dict[str, int]:
         """Get knowledge base statistics."""
+        self._flush()
         return {
             "total_files": len(self.files_metadata),
             "total_chunks": self.collection.count()
         }
 
 
-# Singleton instance
-_rag_service: Optional[RAGService] = None
-
-
+@functools.lru_cache(maxsize=1)
 def get_rag_service() -> RAGService:
     """Get or create RAG service instance."""
-    global _rag_service
-    if _rag_service is None:
-        _rag_service = RAGService()
-    return _rag_service
+    return RAGService()
@@ -1,5 +1,7 @@
 import base64
+import os
 import os.path
+import threading
 from email.message import EmailMessage
 
 from google.auth.transport.requests import Request
@@ -11,18 +13,40 @@ from googleapiclient.errors import HttpError
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://mail.google.com/"]
 
+# Credentials and the built service are cached for the life of the
+# process; token.json is only read once and only written back when the
+# token is actually refreshed, and the HTTPS connection behind the
+# cached service is reused across sends
+_creds = None
+_service = None
+_service_lock = threading.Lock()
+
+
+def _save_token(creds):
+    """Write token.json atomically so a crash can't truncate it."""
+    tmp = "token.json.tmp"
+    with open(tmp, "w") as token:
+        token.write(creds.to_json())
+    os.replace(tmp, "token.json")
+
+
 def authenticate_gmail():
     """
     Handles authentication with the Gmail API.
     Returns:
         creds (google.oauth2.credentials.Credentials): The authenticated credentials.
     """
-    creds = None
+    global _creds
+
+    creds = _creds
+    if creds and creds.valid:
+        return creds
+
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first time.
-    if os.path.exists("token.json"):
+    if creds is None and os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    
+
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -38,25 +62,102 @@ def authenticate_gmail():
                 "credentials.json", SCOPES
             )
             creds = flow.run_local_server(port=0)
-        
+
         # Save the credentials for the next run
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-            
+        _save_token(creds)
+
+    _creds = creds
     return creds
 
+
+def _get_service():
+    """Return the cached Gmail service, (re)building it only when the
+    credentials are missing or no longer valid."""
+    global _service
+
+    with _service_lock:
+        if _service is not None and _creds is not None and _creds.valid:
+            return _service
+
+        creds = authenticate_gmail()
+        if not creds:
+            return None
+
+        _service = build("gmail", "v1", credentials=creds)
+        return _service
+
+
+def _build_template_bytes(sender, subject, body):
+    """Serialize one EmailMessage with a placeholder To header.
+
+    For a campaign the headers and MIME layout are identical for every
+    recipient, so the message is assembled and serialized once; per
+    recipient only the placeholder is substituted and base64 applied.
+    """
+    message = EmailMessage()
+    message.set_content(body)
+    message["To"] = "__TO__"
+    message["From"] = sender
+    message["Subject"] = subject
+    return message.as_bytes()
+
+
+def _build_raw(template_bytes, to_addr):
+    """Fill the To placeholder and base64url-encode for the API."""
+    raw = template_bytes.replace(b"__TO__", to_addr.encode())
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def gmail_send_campaign(recipients, subject, body, sender="me"):
+    """Send the same message to many recipients.
+
+    The MIME template is built once and each batch of up to 100 sends
+    goes out in a single HTTP round trip via the Gmail batch endpoint.
+    Returns the list of sent message ids (None for failures).
+    """
+    service = _get_service()
+
+    if not service:
+        print("Failed to retrieve credentials.")
+        return []
+
+    template_bytes = _build_template_bytes(sender, subject, body)
+    results = [None] * len(recipients)
+
+    def _collect(request_id, response, exception):
+        if exception is not None:
+            print(f"Error sending to {recipients[int(request_id)]}: {exception}")
+        else:
+            results[int(request_id)] = response["id"]
+
+    try:
+        for start in range(0, len(recipients), 100):
+            batch = service.new_batch_http_request(callback=_collect)
+            for i, to_addr in enumerate(recipients[start:start + 100], start):
+                batch.add(
+                    service.users().messages().send(
+                        userId="me",
+                        body={"raw": _build_raw(template_bytes, to_addr)}
+                    ),
+                    request_id=str(i)
+                )
+            batch.execute()
+    except HttpError as error:
+        print(f"An error occurred: {error}")
+
+    return results
+
+
 def gmail_send_message():
     """Create and send an email message using the shared auth function."""
-    
-    # 1. Get credentials from our new helper function
-    creds = authenticate_gmail()
-    
-    if not creds:
+
+    service = _get_service()
+
+    if not service:
         print("Failed to retrieve credentials.")
         return
 
     try:
-        service = build("gmail", "v1", credentials=creds)
         message = EmailMessage()
 
         message.set_content("Yes I can send email by gmail API")